@@ -4,9 +4,11 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtSvg import *
 import numpy as np
 import math
+from moon_system import SatelliteBody
+from solar_system_model import MOON_SOFTENING
 
 
-class Moon(QGraphicsPixmapItem):
+class Moon(SatelliteBody, QGraphicsPixmapItem):
     G = 6.67428e-11  # Gravitational constant
     # Using a small timestep for physics updates; adjust as needed.
     TIMESTEP = 3600 * 24 / 10 # Example: one day per physics step
@@ -14,6 +16,7 @@ class Moon(QGraphicsPixmapItem):
     SCALE = 70000
     #37400
     METER_PER_PIXEL = AU / SCALE
+    SOFTENING = MOON_SOFTENING  # Plummer softening length [m]
 
     def __init__(self, name, mass, scene, x, y, size, texture_path, planet):
         super().__init__()
@@ -71,7 +74,6 @@ class Moon(QGraphicsPixmapItem):
         self.setPos((self.sim_pos[0] - self.planet.sim_pos[0]) / self.METER_PER_PIXEL + self.planet.x(),
                     (self.sim_pos[1] - self.planet.sim_pos[1]) / self.METER_PER_PIXEL + self.planet.y())
         self.velocity = np.array([0.0, 0.0])  # Absolute velocity (for reference)
-        self.acceleration = np.array([0.0, 0.0])
         scene.addItem(self)
         self.scene = scene
         self.setZValue(1)
@@ -122,30 +124,13 @@ class Moon(QGraphicsPixmapItem):
     def setFocusState(self, focused: bool):
         self.text_item.setVisible(focused)
 
-    def attraction(self, other):
-        own_pos = self.sim_pos
-        other_pos = other.sim_pos
-        distance_vector = other_pos - own_pos
-        distance = np.linalg.norm(distance_vector)
-        if distance == 0:
-            return np.array([0.0, 0.0])
-        force = Moon.G * self.mass * other.mass / (distance ** 2)
-        return (force / distance) * distance_vector
-
-    def update_position(self, simulation_speed):
-        # Compute gravitational force and update relative motion
-        net_force = self.attraction(self.planet)
-        a_rel = net_force / self.mass
-        self.rel_velocity += a_rel * self.TIMESTEP * simulation_speed
-        self.rel_pos += self.rel_velocity * self.TIMESTEP * simulation_speed
-
-        # Recompute the absolute simulation position
-        self.sim_pos = self.planet.sim_pos + self.rel_pos # Earth size multiplier = 1
-
-        # Compute new on-screen position relative to the planet's position
+    def sync_position(self, rel_pos=None):
+        # The orbit is advanced by the MoonSystem; place the moon relative to its planet on screen
+        if rel_pos is None:
+            rel_pos = self.rel_pos
         new_pos = QPointF(
-            self.rel_pos[0] * self.planet.size / 150 / self.METER_PER_PIXEL + self.planet.x(),
-            self.rel_pos[1] * self.planet.size / 150 / self.METER_PER_PIXEL + self.planet.y()
+            rel_pos[0] * self.planet.size / 150 / self.METER_PER_PIXEL + self.planet.x(),
+            rel_pos[1] * self.planet.size / 150 / self.METER_PER_PIXEL + self.planet.y()
         )
 
         self.updatePosition(new_pos)
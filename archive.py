@@ -0,0 +1,273 @@
+"""Multi-resolution compressed archive of a trajectory file.
+
+Level 0 holds every record of the trajectory, every further level every
+`factor`-th record of the one below, down to a single chunk. Each level is
+cut into chunks of `chunk` records that are compressed independently.
+
+Every body is quantized to a fixed precision, so each coordinate of a decoded
+state is within half of it. It is stored relative to its reference body (moons
+to their planet, everything else to the heaviest body) and differenced against
+a prediction: the previous decoded state carried along its two-body orbit to
+the next record. Planets and moons follow such orbits closely, so the
+differences stay small even when the records are far apart compared to an
+orbit, where plain differences along time would not. The differences are
+zigzag-encoded, byte-shuffled and deflated.
+
+The chunk index sits in front of the data, so opening an archive only reads
+the index, and a reader only inflates the chunks of the level and time
+window it asks for.
+
+Example:
+    python archive.py century.traj century.arch
+"""
+import argparse
+import os
+import sys
+import time
+import zlib
+from collections import OrderedDict
+import numpy as np
+import kernels
+from ephemeris import hermite
+from solar_system_model import G
+from trajectory import TrajectoryFile, SLOT_DTYPE
+
+MAGIC = b"SSARCH01"
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("bodies", "<i4"), ("levels", "<i4"), ("chunks", "<i4"),
+                         ("position_precision", "<f8"), ("velocity_precision", "<f8")])
+LEVEL_DTYPE = np.dtype([("stride", "<i8"), ("count", "<i8"), ("first_chunk", "<i4"), ("chunks", "<i4")])
+CHUNK_DTYPE = np.dtype([("start", "<f8"), ("end", "<f8"), ("count", "<i4"), ("offset", "<i8"), ("nbytes", "<i8")])
+
+
+def reference_bodies(kinds, parents, masses):
+    """Reference slot of every slot, -1 for the heaviest body, which is stored as it is."""
+    heaviest = int(np.argmax(masses))
+    centers = np.where(np.array(kinds) == "moon", parents, heaviest)
+    centers[heaviest] = -1
+    return centers
+
+
+def relative_states(states, centers):
+    # NaN where the body or its reference body is missing
+    rel = states.copy()
+    has = centers >= 0
+    rel[:, has] -= states[:, centers[has]]
+    return rel
+
+
+def absolute_states(rel, centers):
+    states = rel.copy()
+    depth = np.zeros(len(centers), dtype=int)
+    for _ in range(len(centers)):
+        depth = np.where(centers >= 0, depth[centers] + 1, 0)
+    # Reference bodies are resolved before the bodies that depend on them
+    for level in range(1, depth.max() + 1 if len(depth) else 1):
+        rows = np.flatnonzero(depth == level)
+        states[:, rows] += states[:, centers[rows]]
+    return states
+
+
+def predict(prev, present, gm, dt):
+    """States (records, bodies, 4) relative to the reference bodies, dt seconds after `prev`: along
+    two-body orbits, in straight lines where gm is 0, and 0 where there was no previous state."""
+    prediction = np.zeros_like(prev)
+    moving = present & (gm == 0)
+    prediction[moving, :2] = prev[moving, :2] + prev[moving, 2:] * dt
+    prediction[moving, 2:] = prev[moving, 2:]
+    orbiting = present & (gm > 0) & (np.abs(prev[..., :2]).max(axis=-1) > 0)
+    rel_pos = prev[orbiting, :2].copy()
+    rel_vel = prev[orbiting, 2:].copy()
+    kernels.kepler_drift(rel_pos, rel_vel, np.broadcast_to(gm, orbiting.shape)[orbiting], dt)
+    prediction[orbiting, :2] = rel_pos
+    prediction[orbiting, 2:] = rel_vel
+    return prediction
+
+
+def encode_chunk(times, states, centers, gm, scale):
+    """Compressed bytes of `times` and the (records, bodies, 4) `states`, NaN for missing bodies."""
+    present = np.isfinite(relative_states(states, centers)[:, :, 0])
+    # Quantized before taking the relative states, so the decoder can sum the integers back exactly
+    # and the rounding of a reference body does not add to the bodies that depend on it
+    q = relative_states(np.rint(np.where(present[:, :, None], states, 0.0) / scale).astype(np.int64), centers)
+    residual = q.copy()
+    # Predicted from the quantized states the decoder will have, one call per distinct record spacing
+    dt = np.diff(times)
+    for spacing in np.unique(dt):
+        k = 1 + np.flatnonzero(dt == spacing)
+        guess = np.rint(predict(q[k - 1] * scale, present[k - 1], gm, spacing) / scale).astype(np.int64)
+        residual[k] = np.where(present[k, :, None], q[k] - guess, 0)
+    zigzag = ((residual << 1) ^ (residual >> 63)).view(np.uint64)
+    # Bytes of equal significance next to each other; the high ones are mostly zero
+    shuffled = zigzag.reshape(-1).view(np.uint8).reshape(-1, 8).T
+    return zlib.compress(np.ascontiguousarray(times, dtype="<f8").tobytes() + np.packbits(present).tobytes()
+                         + shuffled.tobytes(), 6)
+
+
+def decode_chunk(blob, count, centers, gm, scale):
+    bodies = len(centers)
+    data = zlib.decompress(blob)
+    times = np.frombuffer(data, dtype="<f8", count=count)
+    mask_bytes = (count * bodies + 7) // 8
+    present = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=mask_bytes, offset=8 * count),
+                            count=count * bodies).reshape(count, bodies).astype(bool)
+    shuffled = np.frombuffer(data, dtype=np.uint8, offset=8 * count + mask_bytes).reshape(8, -1)
+    zigzag = np.ascontiguousarray(shuffled.T).view("<u8").reshape(count, bodies, 4)
+    q = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+    for k in range(1, count):
+        guess = np.rint(predict(q[k - 1:k] * scale, present[k - 1:k], gm, times[k] - times[k - 1]) / scale)
+        q[k] = np.where(present[k, :, None], q[k] + guess[0].astype(np.int64), 0)
+    states = absolute_states(q, centers) * scale
+    states[~present] = np.nan
+    return times, states
+
+
+def write_archive(path, trajectory, position_precision=1000.0, velocity_precision=1e-3, chunk=1024, factor=4):
+    """Archive an opened TrajectoryFile; positions are rounded to multiples of position_precision [m] and
+    velocities to multiples of velocity_precision [m/s]."""
+    times = np.array(trajectory.times)
+    bodies = len(trajectory.names)
+    centers = reference_bodies(trajectory.kinds, trajectory.parents, trajectory.masses)
+    gm = np.where(centers >= 0, G * trajectory.masses[centers], 0.0)
+    scale = np.array([position_precision, position_precision, velocity_precision, velocity_precision])
+    levels, chunks, blobs = [], [], []
+    offset = 0
+    stride = 1
+    while True:
+        rows = np.arange(0, len(times), stride)
+        levels.append((stride, len(rows), len(chunks), -(-len(rows) // chunk)))
+        for first in range(0, len(rows), chunk):
+            part = rows[first:first + chunk]
+            blob = encode_chunk(times[part], trajectory.states[part], centers, gm, scale)
+            chunks.append((times[part[0]], times[part[-1]], len(part), offset, len(blob)))
+            blobs.append(blob)
+            offset += len(blob)
+        if len(rows) <= chunk:
+            break
+        stride *= factor
+
+    header = np.array((MAGIC, bodies, len(levels), len(chunks), position_precision, velocity_precision),
+                      dtype=HEADER_DTYPE)
+    table = np.array(trajectory.table[:bodies])
+    with open(path, "wb") as file:
+        header.tofile(file)
+        table.tofile(file)
+        np.array(levels, dtype=LEVEL_DTYPE).tofile(file)
+        np.array(chunks, dtype=CHUNK_DTYPE).tofile(file)
+        for blob in blobs:
+            file.write(blob)
+
+
+class TrajectoryArchive:
+    """Reader of an archive; offers the same lookups as TrajectoryFile plus windowed reads per level."""
+
+    def __init__(self, path, cache_size=32):
+        self.path = path
+        with open(path, "rb") as file:
+            header = np.fromfile(file, dtype=HEADER_DTYPE, count=1)
+            if len(header) == 0 or header[0]["magic"] != MAGIC:
+                raise ValueError(f"{path} is not a trajectory archive")
+            header = header[0]
+            table = np.fromfile(file, dtype=SLOT_DTYPE, count=int(header["bodies"]))
+            self.levels = np.fromfile(file, dtype=LEVEL_DTYPE, count=int(header["levels"]))
+            self.chunks = np.fromfile(file, dtype=CHUNK_DTYPE, count=int(header["chunks"]))
+            self.data_offset = file.tell()
+        self.scale = np.array([header["position_precision"]] * 2 + [header["velocity_precision"]] * 2)
+        self.names = [name.decode("utf-8", "ignore") for name in table["name"]]
+        self.kinds = [kind.decode() for kind in table["kind"]]
+        self.parents = table["parent"].astype(int)
+        self.masses = table["mass"].astype(float)
+        self.sizes = table["size"].astype(float)
+        self.centers = reference_bodies(self.kinds, self.parents, self.masses)
+        self.gm = np.where(self.centers >= 0, G * self.masses[self.centers], 0.0)
+        self.start = float(self.chunks["start"][0]) if len(self.chunks) else 0.0
+        self.end = float(self.chunks["end"][self.levels["chunks"][0] - 1]) if len(self.chunks) else 0.0
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # Chunk number -> (times, states), least recently used first
+
+    def __len__(self):
+        return int(self.levels["count"][0]) if len(self.levels) else 0
+
+    def refresh(self):
+        pass  # Archives are written in one go
+
+    def _chunk(self, number):
+        if number in self._cache:
+            self._cache.move_to_end(number)
+            return self._cache[number]
+        entry = self.chunks[number]
+        with open(self.path, "rb") as file:
+            file.seek(self.data_offset + int(entry["offset"]))
+            blob = file.read(int(entry["nbytes"]))
+        decoded = decode_chunk(blob, int(entry["count"]), self.centers, self.gm, self.scale)
+        self._cache[number] = decoded
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return decoded
+
+    def level_for(self, start, end, max_records):
+        """Finest level with at most max_records records between start and end."""
+        span = max(end - start, 0.0)
+        cadence = (self.end - self.start) / max(len(self) - 1, 1)
+        for level, stride in enumerate(self.levels["stride"]):
+            if span / (cadence * stride) <= max_records:
+                return level
+        return len(self.levels) - 1
+
+    def read(self, start, end, level=0):
+        """Times and (records, bodies, 4) states of one level between start and end, inflating only the
+        chunks that overlap the window."""
+        first = int(self.levels["first_chunk"][level])
+        entries = self.chunks[first:first + int(self.levels["chunks"][level])]
+        numbers = first + np.flatnonzero((entries["end"] >= start) & (entries["start"] <= end))
+        if len(numbers) == 0:
+            return np.zeros(0), np.zeros((0, len(self.names), 4))
+        times, states = zip(*(self._chunk(int(number)) for number in numbers))
+        times = np.concatenate(times)
+        states = np.concatenate(states)
+        keep = (times >= start) & (times <= end)
+        return times[keep], states[keep]
+
+    def positions_at(self, time, level=0):
+        """Positions (bodies, 2) at `time`, interpolated like TrajectoryFile.positions_at."""
+        first = int(self.levels["first_chunk"][level])
+        entries = self.chunks[first:first + int(self.levels["chunks"][level])]
+        k = min(max(int(np.searchsorted(entries["start"], time, "right")) - 1, 0), len(entries) - 1)
+        times, states = self._chunk(first + k)
+        if k + 1 < len(entries) and time >= times[-1]:
+            # Between the last record of this chunk and the first of the next
+            next_times, next_states = self._chunk(first + k + 1)
+            times = np.concatenate((times[-1:], next_times[:1]))
+            states = np.concatenate((states[-1:], next_states[:1]))
+        if len(times) < 2:
+            return states[0, :, :2].copy()
+        i = min(max(int(np.searchsorted(times, time, "right")) - 1, 0), len(times) - 2)
+        h = times[i + 1] - times[i]
+        s = min(max((time - times[i]) / h, 0.0), 1.0)
+        return hermite(states[i, :, :2], states[i, :, 2:], states[i + 1, :, :2], states[i + 1, :, 2:], h, s)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compress a trajectory file into a multi-resolution archive")
+    parser.add_argument("trajectory")
+    parser.add_argument("output")
+    parser.add_argument("--position-precision", type=float, default=1000.0, help="metres")
+    parser.add_argument("--velocity-precision", type=float, default=1e-3, help="metres per second")
+    parser.add_argument("--chunk", type=int, default=1024, help="records per compressed chunk")
+    parser.add_argument("--factor", type=int, default=4, help="decimation between levels")
+    args = parser.parse_args(argv)
+
+    trajectory = TrajectoryFile(args.trajectory)
+    start = time.perf_counter()
+    write_archive(args.output, trajectory, args.position_precision, args.velocity_precision, args.chunk, args.factor)
+    elapsed = time.perf_counter() - start
+    raw = len(trajectory) * (8 + len(trajectory.names) * 32)
+    size = os.path.getsize(args.output)
+    archive = TrajectoryArchive(args.output)
+    print(f"{len(trajectory)} records of {len(trajectory.names)} bodies in {len(archive.levels)} levels, "
+          f"archived in {elapsed:.1f} s")
+    print(f"{raw / 1e6:.1f} MB of records -> {size / 1e6:.2f} MB ({raw / size:.1f}x), written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
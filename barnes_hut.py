@@ -0,0 +1,146 @@
+import sys
+import time
+import numpy as np
+
+G = 6.67428e-11
+
+
+class QuadTree:
+    """Barnes-Hut quadtree over a set of point masses in 2D.
+
+    The tree is built once per physics step. Accelerations are evaluated by
+    walking the tree with whole arrays of target points at a time, so each
+    node is visited once per step no matter how many targets use it.
+
+    eps2 holds the squared Plummer softening length of every body; a node
+    uses the mass-weighted mean of its bodies.
+    """
+
+    def __init__(self, pos, mass, leaf_size=8, eps2=0.0):
+        self.pos = pos
+        self.mass = mass
+        self.eps2 = np.broadcast_to(np.asarray(eps2, dtype=float), mass.shape)
+        self.leaf_size = leaf_size
+        self.com = []  # Center of mass per node
+        self.node_mass = []
+        self.node_eps2 = []
+        self.width = []  # Edge length of the node's square
+        self.children = []  # Child node ids, empty for leaves
+        self.members = []  # Body indices for leaves, None for inner nodes
+
+        if len(mass):
+            low = pos.min(axis=0)
+            high = pos.max(axis=0)
+            width = max(float((high - low).max()), 1.0) * 1.0001
+            self._build(np.arange(len(mass)), (low + high) / 2, width)
+
+    def _build(self, index, center, width):
+        node = len(self.com)
+        m = self.mass[index]
+        total = m.sum()
+        if total > 0:
+            com = (self.pos[index] * m[:, None]).sum(axis=0) / total
+            eps2 = float((self.eps2[index] * m).sum() / total)
+        else:
+            com = center
+            eps2 = 0.0
+        self.com.append(com)
+        self.node_mass.append(total)
+        self.node_eps2.append(eps2)
+        self.width.append(width)
+        self.children.append([])
+        self.members.append(None)
+
+        if len(index) <= self.leaf_size or width < 1.0:
+            self.members[node] = index
+            return node
+
+        p = self.pos[index]
+        east = p[:, 0] >= center[0]
+        south = p[:, 1] >= center[1]
+        quarter = width / 4
+        for is_east in (False, True):
+            for is_south in (False, True):
+                mask = (east == is_east) & (south == is_south)
+                if mask.any():
+                    offset = np.array([quarter if is_east else -quarter,
+                                       quarter if is_south else -quarter])
+                    child = self._build(index[mask], center + offset, width / 2)
+                    self.children[node].append(child)
+        return node
+
+    def accelerations(self, targets, theta=0.5, target_eps2=0.0):
+        """Accelerations (m/s^2) at the target positions, shape (len(targets), 2)."""
+        acc = np.zeros((len(targets), 2))
+        if not self.com:
+            return acc
+        target_eps2 = np.broadcast_to(np.asarray(target_eps2, dtype=float), len(targets))
+        stack = [(0, np.arange(len(targets)))]
+        while stack:
+            node, index = stack.pop()
+            diff = self.com[node] - targets[index]
+            r2 = np.einsum("ij,ij->i", diff, diff)
+
+            # Opening criterion: far enough away to treat the node as a point mass
+            far = self.width[node] ** 2 < (theta ** 2) * r2
+            if far.any():
+                d = diff[far]
+                r = r2[far] + (target_eps2[index[far]] + self.node_eps2[node]) / 2
+                acc[index[far]] += (G * self.node_mass[node] / (r * np.sqrt(r)))[:, None] * d
+            near = index[~far]
+            if len(near) == 0:
+                continue
+
+            if self.members[node] is not None:
+                # Leaf: direct sum against its bodies
+                members = self.members[node]
+                acc[near] += direct_accelerations(targets[near], self.pos[members], self.mass[members],
+                                                  target_eps2[near], self.eps2[members])
+            else:
+                for child in self.children[node]:
+                    stack.append((child, near))
+        return acc
+
+
+def direct_accelerations(targets, pos, mass, target_eps2=0.0, eps2=0.0):
+    """Exact pairwise sum; a body never attracts anything sitting exactly on it.
+
+    target_eps2 and eps2 are squared Plummer softening lengths of the targets
+    and sources (scalars or per body). A pair is softened with their mean.
+    """
+    diff = pos[None, :, :] - targets[:, None, :]
+    r2 = np.einsum("ijk,ijk->ij", diff, diff)
+    coincident = r2 == 0
+    r2 = r2 + np.add.outer(target_eps2, eps2) / 2
+    r2[coincident] = np.inf
+    weight = G * mass / (r2 * np.sqrt(r2))
+    return np.einsum("ij,ijk->ik", weight, diff)
+
+
+def compare_with_direct(count=2000, thetas=(0.3, 0.5, 0.7, 1.0), seed=0):
+    """Trade-off report: (theta, rms relative error, max relative error, tree time, direct time)."""
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-30, 30, (count, 2)) * 1.496e11
+    mass = rng.uniform(1e22, 1e25, count)
+
+    start = time.perf_counter()
+    exact = direct_accelerations(pos, pos, mass)
+    direct_time = time.perf_counter() - start
+    norm = np.linalg.norm(exact, axis=1)
+
+    report = []
+    for theta in thetas:
+        start = time.perf_counter()
+        approx = QuadTree(pos, mass).accelerations(pos, theta)
+        tree_time = time.perf_counter() - start
+        error = np.linalg.norm(approx - exact, axis=1) / norm
+        report.append((theta, float(np.sqrt(np.mean(error ** 2))), float(error.max()), tree_time, direct_time))
+    return report
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{count} bodies")
+    print(" theta   rms error   max error   tree [s]  direct [s]")
+    for theta, rms, worst, tree_time, direct_time in compare_with_direct(count):
+        print(f"{theta:6.2f} {rms:11.2e} {worst:11.2e} {tree_time:10.4f} {direct_time:11.4f}")
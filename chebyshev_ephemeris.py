@@ -0,0 +1,190 @@
+"""Chebyshev ephemeris of the default solar system.
+
+The compiler runs SolarSystemModel.default once, samples every body at a
+fixed spacing and fits each body with piecewise Chebyshev polynomials, the
+way JPL DE files store planetary ephemerides. Every body gets intervals of
+about a quarter of its orbital period (at most max_interval), so moons get
+short intervals and the outer planets long ones. The coefficients are written
+to a compact binary file; ChebyshevEphemeris evaluates positions and
+velocities of all bodies at any number of dates at once, without integrating.
+
+Planets are stored in engine coordinates, moons relative to their planet.
+
+Example:
+    python chebyshev_ephemeris.py --years 100 --output solar_system.cheb
+"""
+import argparse
+import sys
+import time
+import numpy as np
+from numpy.polynomial import chebyshev
+from kepler import KeplerOrbits
+from solar_system_model import SolarSystemModel, G, SECONDS_PER_YEAR
+
+MAGIC = b"CHEBEPH1"
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("bodies", "<i4"), ("degree", "<i4"), ("start", "<f8"), ("end", "<f8")])
+# parent is the row of the planet for moons and -1 for bodies in engine coordinates
+BODY_DTYPE = np.dtype([("name", "S16"), ("parent", "<i4"), ("count", "<i4"), ("interval", "<f8"),
+                       ("offset", "<i8")])
+
+
+def sample_system(model, steps, spacing):
+    """Engine positions and moon positions relative to their planets, now and after each of
+    `steps` advances of `spacing` seconds."""
+    n = model.engine.count
+    pos = np.empty((steps + 1, n + len(model.moons), 2))
+    for k in range(steps + 1):
+        if k:
+            # Closed form wherever it is exact, the numerical integrator otherwise
+            model.advance(spacing, spacing, closed_form=True)
+        pos[k, :n] = model.engine.pos[:n]
+        pos[k, n:] = model.moon_system.rel_pos
+    return pos
+
+
+def orbital_periods(model):
+    """Two-body period [s] of every planet around the sun and of every moon around its planet."""
+    engine = model.engine
+    n = engine.count
+    sun = np.argmax(engine.mass[:n])
+    with np.errstate(divide="ignore", invalid="ignore"):  # The sun orbits itself
+        planets = KeplerOrbits(engine.pos[:n] - engine.pos[sun], engine.vel[:n] - engine.vel[sun],
+                               G * engine.mass[sun])
+    periods = 2 * np.pi / planets.n
+    periods[sun] = np.inf
+    moons = KeplerOrbits(model.moon_system.rel_pos, model.moon_system.rel_vel, model.moon_system.parent_gm)
+    return np.concatenate((periods, 2 * np.pi / moons.n))
+
+
+def fit_intervals(samples, per_interval, degree):
+    """Coefficients (intervals, 2, degree + 1) of one body sampled per_interval times per interval."""
+    count = (len(samples) - 1) // per_interval
+    # Neighbouring intervals share their end samples, so the pieces meet
+    windows = np.stack([samples[k * per_interval:(k + 1) * per_interval + 1] for k in range(count)], axis=1)
+    x = np.linspace(-1, 1, per_interval + 1)
+    coefficients = chebyshev.chebfit(x, windows.reshape(per_interval + 1, -1), degree)
+    return coefficients.reshape(degree + 1, count, 2).transpose(1, 2, 0)
+
+
+def compile_ephemeris(path, years=100.0, spacing=3600.0, degree=12, max_interval=32 * 86400.0, model=None):
+    """Fit the default solar system over `years` and write the coefficients to `path`.
+
+    Returns the largest fit residual [m] over all samples.
+    """
+    if model is None:
+        model = SolarSystemModel.default()
+    names = [body.name for body in model.engine.bodies] + [moon.name for moon in model.moons]
+    parents = [-1] * model.engine.count + [moon.planet.engine_index for moon in model.moons]
+    start = model.engine.time
+
+    # Samples per interval: a quarter orbit (at most max_interval) rounded down to a power of two,
+    # but enough samples for the degree
+    quarter = np.minimum(orbital_periods(model) / 4, max_interval) / spacing
+    fewest = 2 ** np.ceil(np.log2(2 * (degree + 1)))
+    per_interval = np.maximum(2 ** np.floor(np.log2(quarter)), fewest).astype(int)
+    # Every interval length divides the longest one, so chunks of that length hold whole intervals
+    chunk = int(per_interval.max())
+    chunks = max(int(years * SECONDS_PER_YEAR / spacing) // chunk, 1)
+
+    pieces = [[] for _ in names]
+    residual = 0.0
+    for _ in range(chunks):
+        pos = sample_system(model, chunk, spacing)
+        for b in range(len(names)):
+            coefficients = fit_intervals(pos[:, b], per_interval[b], degree)
+            pieces[b].append(coefficients)
+            x = np.linspace(-1, 1, per_interval[b] + 1)[:-1]
+            fitted = np.einsum("kcd,dx->kxc", coefficients, chebyshev.chebvander(x, degree).T).reshape(-1, 2)
+            residual = max(residual, float(np.abs(fitted - pos[:-1, b]).max()))
+
+    table = np.zeros(len(names), dtype=BODY_DTYPE)
+    counts = chunks * chunk // per_interval
+    table["name"] = [name.encode() for name in names]
+    table["parent"] = parents
+    table["count"] = counts
+    table["interval"] = per_interval * spacing
+    table["offset"] = np.cumsum(counts) - counts
+    header = np.array([(MAGIC, len(names), degree, start, start + chunks * chunk * spacing)], dtype=HEADER_DTYPE)
+    with open(path, "wb") as file:
+        header.tofile(file)
+        table.tofile(file)
+        for body_pieces in pieces:
+            np.concatenate(body_pieces).astype("<f8").tofile(file)
+    return residual
+
+
+class ChebyshevEphemeris:
+    """Evaluator for a file written by compile_ephemeris."""
+
+    def __init__(self, path):
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)[0]
+        if header["magic"] != MAGIC:
+            raise ValueError(f"{path} is not a Chebyshev ephemeris")
+        self.degree = int(header["degree"])
+        self.start = float(header["start"])
+        self.end = float(header["end"])
+        table = np.fromfile(path, dtype=BODY_DTYPE, count=int(header["bodies"]), offset=HEADER_DTYPE.itemsize)
+        self.names = [name.decode() for name in table["name"]]
+        self.parents = table["parent"].astype(int)
+        self.counts = table["count"].astype(int)
+        self.intervals = table["interval"].astype(float)
+        self.offsets = table["offset"].astype(int)
+        # Coefficients stay on disk until they are needed
+        self.coefficients = np.memmap(path, dtype="<f8", mode="r",
+                                      offset=HEADER_DTYPE.itemsize + BODY_DTYPE.itemsize * len(table),
+                                      shape=(int(self.counts.sum()), 2, self.degree + 1))
+
+    def evaluate(self, t, velocities=False):
+        """Positions (len(t), bodies, 2) at the simulated times t, and velocities if asked for."""
+        t = np.atleast_1d(np.asarray(t, dtype=float))[:, None] - self.start
+        k = np.clip((t // self.intervals).astype(int), 0, self.counts - 1)
+        s = 2 * (t - k * self.intervals) / self.intervals - 1
+        coefficients = self.coefficients[self.offsets + k]
+
+        # Chebyshev polynomials T_d(s) and their derivatives by recurrence
+        basis = np.empty(s.shape + (self.degree + 1,))
+        slope = np.zeros_like(basis)
+        basis[..., 0] = 1
+        basis[..., 1] = s
+        slope[..., 1] = 1
+        for d in range(1, self.degree):
+            basis[..., d + 1] = 2 * s * basis[..., d] - basis[..., d - 1]
+            slope[..., d + 1] = 2 * basis[..., d] + 2 * s * slope[..., d] - slope[..., d - 1]
+        pos = np.einsum("tbd,tbcd->tbc", basis, coefficients)
+        if not velocities:
+            return pos
+        vel = np.einsum("tbd,tbcd->tbc", slope, coefficients) * (2 / self.intervals)[None, :, None]
+        return pos, vel
+
+    def covers(self, t):
+        return self.start <= t <= self.end
+
+    def absolute(self, pos):
+        """Positions with the moons moved from their planets' frame into engine coordinates."""
+        pos = pos.copy()
+        moons = np.flatnonzero(self.parents >= 0)
+        pos[:, moons] += pos[:, self.parents[moons]]
+        return pos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a Chebyshev ephemeris of the default solar system")
+    parser.add_argument("--years", type=float, default=100.0)
+    parser.add_argument("--spacing", type=float, default=3600.0, help="seconds between fitted samples")
+    parser.add_argument("--degree", type=int, default=12)
+    parser.add_argument("--max-interval", type=float, default=32.0, help="longest interval in days")
+    parser.add_argument("--output", default="solar_system.cheb")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    residual = compile_ephemeris(args.output, args.years, args.spacing, args.degree, args.max_interval * 86400)
+    elapsed = time.perf_counter() - start
+    ephemeris = ChebyshevEphemeris(args.output)
+    print(f"{len(ephemeris.names)} bodies over {args.years:g} years compiled in {elapsed:.1f} s")
+    print(f"{ephemeris.coefficients.nbytes / 1e6:.1f} MB of coefficients, largest fit residual {residual / 1e3:.3f} km")
+    print(f"written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
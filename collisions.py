@@ -0,0 +1,75 @@
+import numpy as np
+
+# Collision detection for engine bodies. Every body is a disk of its collision
+# radius that moves in a straight line between two checks. The broadphase bins
+# the boxes around those swept disks into a uniform grid (a spatial hash) and
+# only bodies sharing a cell are tested exactly, so the cost grows with the
+# number of bodies and not with the number of pairs.
+
+
+def candidate_pairs(lo, hi, cell):
+    """Pairs (i, j) with i < j whose boxes [lo, hi] share a cell of a uniform grid."""
+    first = np.floor(lo / cell).astype(np.int64)
+    span = np.floor(hi / cell).astype(np.int64) - first + 1
+    counts = span[:, 0] * span[:, 1]
+
+    # One entry per (body, covered cell)
+    owner = np.repeat(np.arange(len(lo)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cell_x = first[owner, 0] + offset // span[owner, 1]
+    cell_y = first[owner, 1] + offset % span[owner, 1]
+    key = (cell_x << 32) ^ (cell_y & 0xFFFFFFFF)
+    order = np.argsort(key, kind="stable")
+    key, owner = key[order], owner[order]
+
+    # Entries of one cell form a run after sorting; every entry pairs with the ones after it in its run
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    lengths = np.diff(np.r_[starts, len(key)])
+    run_end = np.repeat(starts + lengths, lengths)
+    later = run_end - np.arange(len(key)) - 1
+    first_entry = np.repeat(np.arange(len(key)), later)
+    second_entry = first_entry + 1 + np.arange(later.sum()) - np.repeat(np.cumsum(later) - later, later)
+    if len(first_entry) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    a = owner[first_entry]
+    b = owner[second_entry]
+    # Bodies covering several cells meet more than once
+    pair = np.unique(np.minimum(a, b) * len(lo) + np.maximum(a, b))
+    return pair // len(lo), pair % len(lo)
+
+
+def find_collisions(start, end, radius):
+    """Pairs (i, j, t) of bodies that touch while moving from start to end, ordered by the
+    fraction t of the move at which they are closest."""
+    lo = np.minimum(start, end) - radius[:, None]
+    hi = np.maximum(start, end) + radius[:, None]
+    extent = (hi - lo).max(axis=1)
+    # Cells about the size of a typical body; larger ones simply cover more cells
+    i, j = candidate_pairs(lo, hi, max(np.median(extent), 1.0))
+
+    d0 = start[j] - start[i]
+    dd = (end[j] - end[i]) - d0
+    dd2 = np.einsum("ij,ij->i", dd, dd)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(np.where(dd2 > 0, -np.einsum("ij,ij->i", d0, dd) / dd2, 0.0), 0.0, 1.0)
+    closest = d0 + t[:, None] * dd
+    touching = np.einsum("ij,ij->i", closest, closest) < (radius[i] + radius[j]) ** 2
+    order = np.argsort(t[touching], kind="stable")
+    return i[touching][order], j[touching][order], t[touching][order]
+
+
+def bounce(pos, vel, mass, i, j, restitution=1.0):
+    """Collide rows i and j as disks along the line between their centers, in place.
+    False if they are already separating."""
+    normal = pos[j] - pos[i]
+    distance = np.sqrt(normal @ normal)
+    if distance == 0:
+        return False
+    normal /= distance
+    approach = (vel[j] - vel[i]) @ normal
+    if approach >= 0:
+        return False
+    impulse = -(1 + restitution) * approach / (1 / mass[i] + 1 / mass[j])
+    vel[i] -= impulse / mass[i] * normal
+    vel[j] += impulse / mass[j] * normal
+    return True
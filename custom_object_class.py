@@ -5,22 +5,28 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtSvg import *
 import math
 import numpy as np
+from physics_engine import EngineBody
+from solar_system_model import CUSTOM_SOFTENING, scene_radius
 #from main import SolarSystem as main
 
 
-class CustomObject(QGraphicsObject):
+class CustomObject(EngineBody, QGraphicsObject):
     # Simulation constants
     G = 6.67428e-11
     TIMESTEP = 3600 * 24  # 24 hours per physics update (in simulation units)
     AU = 1.496e11
     SCALE = 2000
     METER_PER_PIXEL = AU / SCALE
+    SOFTENING = CUSTOM_SOFTENING  # Plummer softening length [m]
+    COLLIDES = True
+    ESCAPES = True
 
     def __init__(self, name, mass, scene, x, y, size, texture_path):
         super().__init__()
         self.name = name
         self.mass = mass
         self.size = size  # This represents the radius
+        self.radius = scene_radius(size)  # Collision radius [m]
         self.sim_pos = np.array([x * self.AU, y * self.AU])
         self.hover_state = False
         self.distance = math.hypot(0, 0)
@@ -70,7 +76,6 @@ class CustomObject(QGraphicsObject):
 
 
         self.velocity = np.array([0.0, 0.0])
-        self.acceleration = np.array([0.0, 0.0])
         scene.addItem(self)
         self.scene = scene
         self.setZValue(1)
@@ -122,34 +127,14 @@ class CustomObject(QGraphicsObject):
         if self.name != "sun":
             self.text_item.setVisible(focused)
 
-    def attraction(self, other):
-        if self == other:
-            return np.array([0.0, 0.0])
-        own_pos = self.sim_pos
-        other_pos = other.sim_pos
-        distance_vector = other_pos - own_pos
-        distance = np.linalg.norm(distance_vector)
-        if distance == 0:
-            return np.array([0.0, 0.0])
-        force = CustomObject.G * self.mass * other.mass / (distance ** 2)
-        return (force / distance) * distance_vector
-
-    def update_position(self, planets, custom_objects, simulation_speed):
-        net_force = np.array([0.0, 0.0])
-        for planet in planets:
-            if self != planet and planet.name == "sun":
-                net_force += self.attraction(planet)
-        for custom_object in custom_objects:
-            if self != custom_object:
-                net_force += self.attraction(custom_object)
-        self.acceleration = net_force / self.mass
-        self.velocity += self.acceleration * self.TIMESTEP * simulation_speed
-        self.sim_pos += self.velocity * self.TIMESTEP * simulation_speed
-
-        new_pos = QPointF(self.sim_pos[0] / self.METER_PER_PIXEL,
-                            self.sim_pos[1] / self.METER_PER_PIXEL)
-
-            # Update both the planet and its text position
+    def sync_position(self, sim_pos=None):
+        # Physics is stepped by the NBodyEngine; this only mirrors the state (or a snapshot of it) into the scene
+        if sim_pos is None:
+            sim_pos = self.sim_pos
+        new_pos = QPointF(sim_pos[0] / self.METER_PER_PIXEL,
+                          sim_pos[1] / self.METER_PER_PIXEL)
+
+        # Update both the object and its text position
         self.updatePosition(new_pos)
         self.update()  # Request a redraw
 
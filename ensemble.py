@@ -0,0 +1,171 @@
+import sys
+import time
+import numpy as np
+from integrators import INTEGRATORS
+from physics_engine import ENCOUNTER_CHECK
+from solar_system_model import (SolarSystemModel, G, AU, SECONDS_PER_YEAR, METER_PER_PIXEL, MASS_UNIT, CUSTOM_SOFTENING,
+                                launch_velocity, scene_radius)
+
+OUTCOMES = ["orbit", "capture", "escape", "impact"]  # Kinds returned by Ensemble.outcomes
+
+
+class Ensemble:
+    """K independent copies of a system, each with its own launched probe.
+
+    The state of all variants is held as (K, N, 2) position and velocity
+    arrays, and one force evaluation per step covers every variant. The
+    probe is the last body of each copy and attracts the others, just like a
+    custom object. Moons are not part of the ensemble; they do not affect
+    the other bodies.
+
+    Probes with a collision radius are checked for contact with the other
+    bodies every ENCOUNTER_CHECK steps, like colliding custom objects in the
+    engine, and merge into the body they hit.
+    """
+
+    def __init__(self, model, probe_mass, probe_pos, probe_vel, integrator="leapfrog", probe_radius=None):
+        engine = model.engine
+        n = engine.count
+        k = len(probe_mass)
+        self.names = [body.name for body in engine.bodies] + ["probe"]
+        self.pos = np.empty((k, n + 1, 2))
+        self.vel = np.empty((k, n + 1, 2))
+        self.mass = np.empty((k, n + 1))
+        self.pos[:, :n] = engine.pos[:n]
+        self.vel[:, :n] = engine.vel[:n]
+        self.mass[:, :n] = engine.mass[:n]
+        self.pos[:, n] = probe_pos
+        self.vel[:, n] = probe_vel
+        self.mass[:, n] = probe_mass
+        self.eps2 = np.append(engine.softening[:n], CUSTOM_SOFTENING) ** 2
+        self.sources = np.append(np.flatnonzero(engine.is_source[:n]), n)
+        self.integrator = integrator
+        self.radius = np.append(engine.radius[:n], 0.0)
+        self.probe_radius = None if probe_radius is None else np.broadcast_to(np.asarray(probe_radius, float), (k,))
+        self.impacts = np.full(k, -1)  # Row of the body each probe merged into
+        self.time = 0.0
+
+    @classmethod
+    def from_launches(cls, model, launches, integrator="leapfrog", sizes=None):
+        """Variants from create_object style launches: (mass [10^24 kg], x, y, x_dir, y_dir [px], speed [m/s]);
+        sizes are the probe radii in pixels, without them probes do not collide."""
+        launches = np.asarray(launches, dtype=float)
+        mass = launches[:, 0] * MASS_UNIT
+        pos = launches[:, 1:3] * METER_PER_PIXEL
+        vel = np.array([launch_velocity(*launch[1:]) for launch in launches])
+        radius = None if sizes is None else scene_radius(np.asarray(sizes, dtype=float))
+        return cls(model, mass, pos, vel, integrator, radius)
+
+    def accelerations(self, pos):
+        diff = pos[:, None, self.sources, :] - pos[:, :, None, :]
+        r2 = np.einsum("kijd,kijd->kij", diff, diff)
+        coincident = r2 == 0
+        r2 = r2 + np.add.outer(self.eps2, self.eps2[self.sources]) / 2
+        r2[coincident] = np.inf
+        weight = G * self.mass[:, None, self.sources] / (r2 * np.sqrt(r2))
+        return np.einsum("kij,kijd->kid", weight, diff)
+
+    def run(self, seconds, step=3600.0):
+        steps = int(np.ceil(seconds / step))
+        if self.probe_radius is None:
+            INTEGRATORS[self.integrator](self.pos, self.vel, step, steps, self.accelerations)
+        else:
+            for done in range(0, steps, ENCOUNTER_CHECK):
+                start = self.pos.copy()
+                INTEGRATORS[self.integrator](self.pos, self.vel, step, min(ENCOUNTER_CHECK, steps - done),
+                                             self.accelerations)
+                self._collide(start)
+        self.time += steps * step
+
+    def _collide(self, start):
+        """Merge probes into the first body they touched on their straight-line move from start."""
+        probe = len(self.names) - 1
+        flying = np.flatnonzero(self.impacts < 0)
+        d0 = start[flying, :probe] - start[flying, probe, None]
+        dd = self.pos[flying, :probe] - self.pos[flying, probe, None] - d0
+        dd2 = np.einsum("kjd,kjd->kj", dd, dd)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.clip(np.where(dd2 > 0, -np.einsum("kjd,kjd->kj", d0, dd) / dd2, 0.0), 0.0, 1.0)
+        closest = d0 + t[..., None] * dd
+        reach = self.radius[None, :probe] + self.probe_radius[flying, None]
+        touching = np.einsum("kjd,kjd->kj", closest, closest) < reach ** 2
+        hit = touching.any(axis=1)
+        rows = flying[hit]
+        bodies = np.argmin(np.where(touching[hit], t[hit], np.inf), axis=1)
+        # Mass and momentum go to the body; the massless probe rides along with it
+        total = self.mass[rows, bodies] + self.mass[rows, probe]
+        self.vel[rows, bodies] = (self.mass[rows, bodies, None] * self.vel[rows, bodies]
+                                  + self.mass[rows, probe, None] * self.vel[rows, probe]) / total[:, None]
+        self.mass[rows, bodies] = total
+        self.mass[rows, probe] = 0.0
+        self.pos[rows, probe] = self.pos[rows, bodies]
+        self.vel[rows, probe] = self.vel[rows, bodies]
+        self.impacts[rows] = bodies
+
+    def outcomes(self, sun=0):
+        """Per variant (kind, planet, a [AU], e): an "impact" on or a "capture" by the named body, an
+        "escape" from the sun, or a bound heliocentric "orbit" with semi-major axis a and eccentricity e."""
+        probe = len(self.names) - 1
+        results = []
+        gm_sun = G * self.mass[:, sun]
+        r_vec = self.pos[:, probe] - self.pos[:, sun]
+        v_vec = self.vel[:, probe] - self.vel[:, sun]
+        r = np.linalg.norm(r_vec, axis=1)
+        v2 = np.einsum("kd,kd->k", v_vec, v_vec)
+        rv = np.einsum("kd,kd->k", r_vec, v_vec)
+        # Probes merged into the sun sit at r = 0; they are reported as impacts below
+        with np.errstate(divide="ignore", invalid="ignore"):
+            energy = v2 / 2 - gm_sun / r
+            e_vec = ((v2 - gm_sun / r)[:, None] * r_vec - rv[:, None] * v_vec) / gm_sun[:, None]
+            semi_major = -gm_sun / (2 * energy) / AU
+        eccentricity = np.linalg.norm(e_vec, axis=1)
+
+        # Captured: inside a planet's Hill sphere and bound to it
+        captured_by = np.full(len(r), -1)
+        for planet in range(len(self.names) - 1):
+            if planet == sun:
+                continue
+            d_vec = self.pos[:, probe] - self.pos[:, planet]
+            d = np.linalg.norm(d_vec, axis=1)
+            planet_r = np.linalg.norm(self.pos[:, planet] - self.pos[:, sun], axis=1)
+            hill = planet_r * np.cbrt(self.mass[:, planet] / (3 * self.mass[:, sun]))
+            dv = self.vel[:, probe] - self.vel[:, planet]
+            bound = np.einsum("kd,kd->k", dv, dv) / 2 < G * self.mass[:, planet] / d
+            captured_by[(d < hill) & bound & (captured_by < 0)] = planet
+
+        for i in range(len(r)):
+            if self.impacts[i] >= 0:
+                results.append(("impact", self.names[self.impacts[i]], None, None))
+            elif captured_by[i] >= 0:
+                results.append(("capture", self.names[captured_by[i]], None, None))
+            elif energy[i] >= 0:
+                results.append(("escape", None, None, float(eccentricity[i])))
+            else:
+                results.append(("orbit", None, float(semi_major[i]), float(eccentricity[i])))
+        return results
+
+
+def compare_with_separate_runs(count=1000, years=1.0, step=3600.0 * 6, separate=10):
+    """Time `count` variants in one ensemble against `separate` single-variant runs, extrapolated."""
+    model = SolarSystemModel.default(moons=False)
+    speeds = np.linspace(20000, 60000, count)
+    launches = [(1, 3200, 0, 3200, 100, speed) for speed in speeds]
+
+    start = time.perf_counter()
+    ensemble = Ensemble.from_launches(model, launches)
+    ensemble.run(years * SECONDS_PER_YEAR, step)
+    ensemble_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for launch in launches[:separate]:
+        Ensemble.from_launches(model, [launch]).run(years * SECONDS_PER_YEAR, step)
+    separate_time = (time.perf_counter() - start) / separate * count
+    return ensemble, ensemble_time, separate_time
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    ensemble, ensemble_time, separate_time = compare_with_separate_runs(count)
+    kinds = [outcome[0] for outcome in ensemble.outcomes()]
+    print(f"{count} variants: ensemble {ensemble_time:.2f} s, separate runs ~{separate_time:.2f} s")
+    print(", ".join(f"{kind}: {kinds.count(kind)}" for kind in OUTCOMES))
@@ -0,0 +1,112 @@
+import numpy as np
+
+# Recent planet and moon states kept for scrubbing back in time. Positions in
+# between two samples come from cubic Hermite interpolation of the sampled
+# positions and velocities, which follows an orbit closely as long as the
+# sample interval is small against the orbital period.
+
+
+def hermite(p0, v0, p1, v1, h, s):
+    """Position at fraction s of an interval of h seconds from (p0, v0) to (p1, v1)."""
+    s2 = s * s
+    s3 = s2 * s
+    return ((2 * s3 - 3 * s2 + 1) * p0 + (s3 - 2 * s2 + s) * h * v0
+            + (-2 * s3 + 3 * s2) * p1 + (s3 - s2) * h * v1)
+
+
+class EphemerisBuffer:
+    """Ring buffer of planet states (absolute) and moon states (relative to their planet).
+
+    A sample is recorded at most every `interval` simulated seconds and the
+    oldest one is overwritten once `window` seconds are covered, so the
+    memory use is fixed when the buffer is created (see nbytes). Moon rows
+    are NaN for samples taken while the moons were not simulated.
+    """
+
+    def __init__(self, body_count, moon_count, interval=6 * 3600.0, window=20 * 365.25 * 24 * 3600):
+        capacity = int(window // interval) + 1
+        self.interval = interval
+        self.times = np.zeros(capacity)
+        self.pos = np.zeros((capacity, body_count, 2))
+        self.vel = np.zeros((capacity, body_count, 2))
+        self.moon_pos = np.zeros((capacity, moon_count, 2))
+        self.moon_vel = np.zeros((capacity, moon_count, 2))
+        self.head = 0  # Slot of the next sample
+        self.count = 0
+
+    @property
+    def nbytes(self):
+        return sum(arr.nbytes for arr in (self.times, self.pos, self.vel, self.moon_pos, self.moon_vel))
+
+    @property
+    def start(self):
+        return self.times[self._slot(0)] if self.count else None
+
+    @property
+    def end(self):
+        return self.times[self._slot(self.count - 1)] if self.count else None
+
+    def _slot(self, k):
+        # Ring slot of the k-th oldest sample
+        return (self.head - self.count + k) % len(self.times)
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def record(self, time, pos, vel, moon_pos=None, moon_vel=None):
+        """Store a sample unless the last one is less than an interval old; True if stored."""
+        if self.count and time < self.end + self.interval:
+            return False
+        i = self.head
+        self.times[i] = time
+        self.pos[i] = pos
+        self.vel[i] = vel
+        if moon_pos is None or len(moon_pos) != self.moon_pos.shape[1]:
+            self.moon_pos[i] = np.nan
+            self.moon_vel[i] = np.nan
+        else:
+            self.moon_pos[i] = moon_pos
+            self.moon_vel[i] = moon_vel
+        self.head = (i + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+        return True
+
+    def truncate(self, time):
+        """Forget the samples after `time`, e.g. when the simulation branches off from there."""
+        keep = self._find(time) + 1
+        self.head = self._slot(keep)
+        self.count = keep
+
+    def _find(self, time):
+        # Index (oldest = 0) of the last sample at or before `time`, -1 if there is none
+        if self.count == 0:
+            return -1
+        oldest = self._slot(0)
+        capacity = len(self.times)
+        if oldest + self.count <= capacity:
+            return int(np.searchsorted(self.times[oldest:oldest + self.count], time, "right")) - 1
+        wrapped = capacity - oldest  # Samples before the ring wraps around
+        if time >= self.times[0]:
+            return wrapped + int(np.searchsorted(self.times[:self.head], time, "right")) - 1
+        return int(np.searchsorted(self.times[oldest:], time, "right")) - 1
+
+    def sample(self, time):
+        """(time, pos, vel, moon_pos, moon_vel) of the last sample at or before `time`."""
+        k = max(self._find(time), 0)
+        i = self._slot(k)
+        return (self.times[i], self.pos[i].copy(), self.vel[i].copy(), self.moon_pos[i].copy(),
+                self.moon_vel[i].copy())
+
+    def state_at(self, time):
+        """Interpolated (pos, moon_pos) at `time`, clamped to the recorded span."""
+        k = self._find(time)
+        if k < 0 or k == self.count - 1:
+            i = self._slot(max(k, 0))
+            return self.pos[i].copy(), self.moon_pos[i].copy()
+        i, j = self._slot(k), self._slot(k + 1)
+        h = self.times[j] - self.times[i]
+        s = (time - self.times[i]) / h
+        pos = hermite(self.pos[i], self.vel[i], self.pos[j], self.vel[j], h, s)
+        moon_pos = hermite(self.moon_pos[i], self.moon_vel[i], self.moon_pos[j], self.moon_vel[j], h, s)
+        return pos, moon_pos
@@ -0,0 +1,57 @@
+import csv
+import os
+import numpy as np
+from solar_system_model import AU, METER_PER_PIXEL
+
+ESCAPE_MODES = ["bounds", "energy", "distance"]
+SCENE_HALF_WIDTH = 50000 * METER_PER_PIXEL  # Half the QGraphicsScene rectangle [m]
+
+
+class EscapePolicy:
+    """When a custom object has left the system for good.
+
+    "bounds": outside the square |x|, |y| < limit, by default the scene rectangle.
+    "distance": farther than limit from the central body, by default half the
+    scene width.
+    "energy": unbound from the central body (positive orbital energy), moving
+    away from it and farther than limit, by default at any distance.
+
+    With a log path, every escaped body is appended to that CSV file.
+    """
+
+    def __init__(self, mode="bounds", limit=None, log=None):
+        if mode not in ESCAPE_MODES:
+            raise ValueError(f"unknown escape mode {mode!r}, expected one of {ESCAPE_MODES}")
+        if limit is None:
+            limit = 0.0 if mode == "energy" else SCENE_HALF_WIDTH
+        self.mode = mode
+        self.limit = limit
+        self.log = log
+
+    def escaped(self, pos, vel, center_pos, center_vel, gm):
+        """Mask of the rows of pos and vel that have escaped."""
+        if self.mode == "bounds":
+            return np.abs(pos).max(axis=1) > self.limit
+        rel_pos = pos - center_pos
+        r = np.sqrt(np.einsum("ij,ij->i", rel_pos, rel_pos))
+        if self.mode == "distance":
+            return r > self.limit
+        rel_vel = vel - center_vel
+        energy = np.einsum("ij,ij->i", rel_vel, rel_vel) / 2 - gm / r
+        outbound = np.einsum("ij,ij->i", rel_pos, rel_vel) > 0
+        return (energy > 0) & outbound & (r > self.limit)
+
+    def record(self, time, names, pos, vel, center_pos, center_vel, gm):
+        if self.log is None:
+            return
+        rel_pos = pos - center_pos
+        rel_vel = vel - center_vel
+        r = np.sqrt(np.einsum("ij,ij->i", rel_pos, rel_pos))
+        energy = np.einsum("ij,ij->i", rel_vel, rel_vel) / 2 - gm / r
+        new = not os.path.exists(self.log)
+        with open(self.log, "a", newline="") as file:
+            writer = csv.writer(file)
+            if new:
+                writer.writerow(["time", "name", "mode", "x", "y", "vx", "vy", "distance_au", "energy"])
+            for k, name in enumerate(names):
+                writer.writerow([time, name, self.mode, *pos[k], *vel[k], r[k] / AU, energy[k]])
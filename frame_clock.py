@@ -0,0 +1,43 @@
+import time
+
+
+class FixedTimestepClock:
+    """Wall-clock accumulator that hands out fixed physics steps.
+
+    tick() adds the real time since the last call and returns how many
+    steps of `step` seconds are due. At most max_steps are returned per call;
+    time beyond that is dropped so a slow machine falls behind real time
+    instead of spiralling into ever longer frames. alpha is the fraction of a
+    step left in the accumulator, used to interpolate the rendered state.
+    """
+
+    def __init__(self, step=1 / 120, max_steps=8, clock=time.perf_counter):
+        self.step = step
+        self.max_steps = max_steps
+        self.clock = clock
+        self.accumulator = 0.0
+        self.last_time = clock()
+        self.dropped_time = 0.0  # Wall time skipped by the catch-up cap
+
+    def tick(self):
+        now = self.clock()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        steps = int(self.accumulator // self.step)
+        if steps > self.max_steps:
+            self.dropped_time += (steps - self.max_steps) * self.step
+            self.accumulator -= (steps - self.max_steps) * self.step
+            steps = self.max_steps
+        self.accumulator -= steps * self.step
+        return steps
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.last_time = self.clock()
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.step
+
+    def time_to_next_step(self):
+        return max(0.0, self.step - self.accumulator - (self.clock() - self.last_time))
@@ -0,0 +1,140 @@
+import numpy as np
+
+
+def solve_kepler(mean_anomaly, e, tolerance=1e-12, max_iterations=50):
+    """Eccentric anomaly E with E - e sin E = M, vectorized Newton iteration (e < 1)."""
+    M = np.remainder(mean_anomaly, 2 * np.pi)
+    E = np.where(e < 0.8, M, np.pi)
+    for _ in range(max_iterations):
+        delta = (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+        E = E - delta
+        if np.max(np.abs(delta), initial=0.0) < tolerance:
+            break
+    return E
+
+
+class KeplerOrbits:
+    """Closed-form two-body motion of several bodies around one central body.
+
+    The states at the epoch are converted to planar orbital elements once.
+    Positions and velocities at any later time then only need Kepler's
+    equation, solved for all orbits at once. Only bound (elliptic) orbits
+    are supported; check `bound` before using the result.
+    """
+
+    def __init__(self, rel_pos, rel_vel, gm, epoch=0.0):
+        r_vec = np.asarray(rel_pos, dtype=float)
+        v_vec = np.asarray(rel_vel, dtype=float)
+        gm = np.broadcast_to(np.asarray(gm, dtype=float), (len(r_vec),))
+        r = np.linalg.norm(r_vec, axis=1)
+        v2 = np.einsum("ij,ij->i", v_vec, v_vec)
+        rv = np.einsum("ij,ij->i", r_vec, v_vec)
+
+        self.gm = gm
+        self.epoch = epoch
+        # Sense of revolution in the plane (+1 counter-clockwise)
+        h = r_vec[:, 0] * v_vec[:, 1] - r_vec[:, 1] * v_vec[:, 0]
+        self.sense = np.where(h >= 0, 1.0, -1.0)
+
+        e_vec = ((v2 - gm / r)[:, None] * r_vec - rv[:, None] * v_vec) / gm[:, None]
+        self.e = np.linalg.norm(e_vec, axis=1)
+        self.bound = bool(np.all(self.e < 1)) and bool(np.all(v2 < 2 * gm / r))
+        self.omega = np.arctan2(e_vec[:, 1], e_vec[:, 0])  # Direction of periapsis
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.a = 1 / (2 / r - v2 / gm)
+            self.n = np.sqrt(gm / self.a ** 3)
+
+        nu = self.sense * (np.arctan2(r_vec[:, 1], r_vec[:, 0]) - self.omega)
+        E = np.arctan2(np.sqrt(np.maximum(1 - self.e ** 2, 0)) * np.sin(nu), self.e + np.cos(nu))
+        self.M0 = E - self.e * np.sin(E)
+
+    def states(self, t):
+        """Relative positions and velocities at simulated time t, each shape (n, 2)."""
+        e = self.e
+        E = solve_kepler(self.M0 + self.n * (t - self.epoch), e)
+        cos_E, sin_E = np.cos(E), np.sin(E)
+        b = self.a * np.sqrt(1 - e ** 2)
+        E_dot = self.n / (1 - e * cos_E)
+
+        # Perifocal frame, mirrored for clockwise orbits, then rotated to periapsis
+        x, y = self.a * (cos_E - e), self.sense * b * sin_E
+        vx, vy = -self.a * sin_E * E_dot, self.sense * b * cos_E * E_dot
+        cos_w, sin_w = np.cos(self.omega), np.sin(self.omega)
+        pos = np.column_stack((cos_w * x - sin_w * y, sin_w * x + cos_w * y))
+        vel = np.column_stack((cos_w * vx - sin_w * vy, sin_w * vx + cos_w * vy))
+        return pos, vel
+
+
+def stumpff(z):
+    """Stumpff functions C(z) and S(z) for the universal-variable formulation."""
+    c = np.empty_like(z)
+    s = np.empty_like(z)
+    small = np.abs(z) < 1e-4
+    elliptic = (z > 0) & ~small
+    hyperbolic = (z < 0) & ~small
+    x = np.sqrt(z[elliptic])
+    c[elliptic] = (1 - np.cos(x)) / z[elliptic]
+    s[elliptic] = (x - np.sin(x)) / x ** 3
+    x = np.sqrt(-z[hyperbolic])
+    c[hyperbolic] = (np.cosh(x) - 1) / -z[hyperbolic]
+    s[hyperbolic] = (np.sinh(x) - x) / x ** 3
+    zs = z[small]
+    c[small] = 1 / 2 - zs / 24 + zs ** 2 / 720
+    s[small] = 1 / 6 - zs / 120 + zs ** 2 / 5040
+    return c, s
+
+
+def kepler_drift(rel_pos, rel_vel, gm, dt, tolerance=1e-13, max_iterations=50):
+    """Advance two-body orbits by dt in place, for any eccentricity (universal variables).
+
+    Unlike KeplerOrbits this starts from the current state every time and
+    also handles parabolic and hyperbolic orbits, which is what the drift of
+    a Wisdom-Holman step needs. Kepler's equation in the universal anomaly
+    is solved with the Laguerre-Conway iteration.
+    """
+    gm = np.broadcast_to(np.asarray(gm, dtype=float), (len(rel_pos),))
+    r0 = np.sqrt(np.einsum("ij,ij->i", rel_pos, rel_pos))
+    v2 = np.einsum("ij,ij->i", rel_vel, rel_vel)
+    sqrt_gm = np.sqrt(gm)
+    sigma0 = np.einsum("ij,ij->i", rel_pos, rel_vel) / sqrt_gm
+    alpha = 2 / r0 - v2 / gm  # 1/a; negative for hyperbolic orbits
+
+    # Whole revolutions of bound orbits do not change the state
+    t = np.full(len(r0), float(dt))
+    bound = alpha > 0
+    period = 2 * np.pi / np.sqrt(gm[bound] * alpha[bound] ** 3)
+    t[bound] = np.fmod(t[bound], period)
+
+    # Starting guesses after Vallado, Fundamentals of Astrodynamics, algorithm 8
+    chi = sqrt_gm * t / r0
+    chi[bound] = sqrt_gm[bound] * t[bound] * alpha[bound]
+    hyperbolic = alpha < -1e-12
+    a = 1 / alpha[hyperbolic]
+    sign = np.sign(t[hyperbolic])
+    th = t[hyperbolic]
+    chi[hyperbolic] = sign * np.sqrt(-a) * np.log(
+        -2 * gm[hyperbolic] * alpha[hyperbolic] * th
+        / (sigma0[hyperbolic] * sqrt_gm[hyperbolic]
+           + sign * np.sqrt(-gm[hyperbolic] * a) * (1 - r0[hyperbolic] * alpha[hyperbolic])))
+    for _ in range(max_iterations):
+        z = alpha * chi ** 2
+        c, s = stumpff(z)
+        f = sigma0 * chi ** 2 * c + (1 - alpha * r0) * chi ** 3 * s + r0 * chi - sqrt_gm * t
+        df = sigma0 * chi * (1 - z * s) + (1 - alpha * r0) * chi ** 2 * c + r0
+        ddf = sigma0 * (1 - z * c) + (1 - alpha * r0) * chi * (1 - z * s)
+        root = np.sqrt(np.abs(16 * df ** 2 - 20 * f * ddf))
+        delta = 5 * f / (df + np.copysign(root, df))
+        chi = chi - delta
+        if np.max(np.abs(delta) / np.maximum(np.abs(chi), 1e-300), initial=0.0) < tolerance:
+            break
+
+    z = alpha * chi ** 2
+    c, s = stumpff(z)
+    f = 1 - chi ** 2 / r0 * c
+    g = t - chi ** 3 / sqrt_gm * s
+    pos = f[:, None] * rel_pos + g[:, None] * rel_vel
+    r = np.sqrt(np.einsum("ij,ij->i", pos, pos))
+    f_dot = sqrt_gm / (r * r0) * (z * s - 1) * chi
+    g_dot = 1 - chi ** 2 / r * c
+    rel_vel[:] = f_dot[:, None] * rel_pos + g_dot[:, None] * rel_vel
+    rel_pos[:] = pos
@@ -0,0 +1,367 @@
+"""Compiled force and integration kernels, used when Numba is installed.
+
+For the handful of bodies in the default system, a step is dominated by the
+overhead of the many small NumPy calls, not by arithmetic. With Numba the
+whole integration loop (force sum included) runs as one compiled function.
+Without it, BACKEND is "numpy" and the engine keeps using integrators.py.
+
+Run this file to compare their speed; tests/test_kernels.py checks that they agree.
+"""
+import sys
+import time
+import numpy as np
+from barnes_hut import G, direct_accelerations as numpy_direct_accelerations
+from integrators import INTEGRATORS, YOSHIDA_DRIFT, YOSHIDA_KICK, wisdom_holman
+from kepler import kepler_drift as numpy_kepler_drift
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKEND = "numpy" if numba is None else "numba"
+
+
+def _make_integrators(accel):
+    # Compiled copies of integrators.py for one force law.
+    # accel(pos, index, weight, eps2, out) writes the accelerations at pos into out.
+
+    @numba.njit(nogil=True)
+    def euler(pos, vel, dt, steps, index, weight, eps2):
+        a = np.empty_like(pos)
+        for _ in range(steps):
+            accel(pos, index, weight, eps2, a)
+            vel += a * dt
+            pos += vel * dt
+
+    @numba.njit(nogil=True)
+    def leapfrog(pos, vel, dt, steps, index, weight, eps2):
+        a = np.empty_like(pos)
+        pos += vel * (dt / 2)
+        for i in range(steps):
+            accel(pos, index, weight, eps2, a)
+            vel += a * dt
+            pos += vel * (dt if i < steps - 1 else dt / 2)
+
+    @numba.njit(nogil=True)
+    def velocity_verlet(pos, vel, dt, steps, index, weight, eps2):
+        a = np.empty_like(pos)
+        accel(pos, index, weight, eps2, a)
+        for _ in range(steps):
+            vel += a * (dt / 2)
+            pos += vel * dt
+            accel(pos, index, weight, eps2, a)
+            vel += a * (dt / 2)
+
+    @numba.njit(nogil=True)
+    def yoshida4(pos, vel, dt, steps, index, weight, eps2):
+        a = np.empty_like(pos)
+        for _ in range(steps):
+            for k in range(3):
+                pos += vel * (YOSHIDA_DRIFT[k] * dt)
+                accel(pos, index, weight, eps2, a)
+                vel += a * (YOSHIDA_KICK[k] * dt)
+            pos += vel * (YOSHIDA_DRIFT[3] * dt)
+
+    return {
+        "euler": euler,
+        "leapfrog": leapfrog,
+        "velocity-verlet": velocity_verlet,
+        "yoshida4": yoshida4,
+    }
+
+
+if numba is not None:
+    # Compiled code is cached in __pycache__, so only the first run pays for compilation
+    @numba.njit(cache=True, nogil=True)
+    def _source_accelerations(pos, sources, mass, eps2, out):
+        # Attraction of the source rows on every row; coincident bodies are skipped
+        for i in range(pos.shape[0]):
+            ax = 0.0
+            ay = 0.0
+            for s in sources:
+                dx = pos[s, 0] - pos[i, 0]
+                dy = pos[s, 1] - pos[i, 1]
+                r2 = dx * dx + dy * dy
+                if r2 > 0.0:
+                    r2 += (eps2[i] + eps2[s]) / 2
+                    w = G * mass[s] / (r2 * np.sqrt(r2))
+                    ax += w * dx
+                    ay += w * dy
+            out[i, 0] = ax
+            out[i, 1] = ay
+
+    @numba.njit(cache=True, nogil=True)
+    def _central_accelerations(rel_pos, unused, gm, eps2, out):
+        # Every row is pulled towards the origin by its own gm
+        for i in range(rel_pos.shape[0]):
+            x = rel_pos[i, 0]
+            y = rel_pos[i, 1]
+            r2 = x * x + y * y + eps2[i]
+            w = -gm[i] / (r2 * np.sqrt(r2))
+            out[i, 0] = w * x
+            out[i, 1] = w * y
+
+    @numba.njit(cache=True, nogil=True)
+    def _direct_accelerations(targets, pos, mass, target_eps2, eps2):
+        out = np.zeros_like(targets)
+        for i in range(targets.shape[0]):
+            for s in range(pos.shape[0]):
+                dx = pos[s, 0] - targets[i, 0]
+                dy = pos[s, 1] - targets[i, 1]
+                r2 = dx * dx + dy * dy
+                if r2 > 0.0:
+                    r2 += (target_eps2[i] + eps2[s]) / 2
+                    w = G * mass[s] / (r2 * np.sqrt(r2))
+                    out[i, 0] += w * dx
+                    out[i, 1] += w * dy
+        return out
+
+    @numba.njit(cache=True, nogil=True)
+    def _stumpff(z):
+        if abs(z) < 1e-4:
+            return 1 / 2 - z / 24 + z * z / 720, 1 / 6 - z / 120 + z * z / 5040
+        if z > 0:
+            x = np.sqrt(z)
+            return (1 - np.cos(x)) / z, (x - np.sin(x)) / (x * z)
+        x = np.sqrt(-z)
+        return (np.cosh(x) - 1) / -z, (np.sinh(x) - x) / (x * -z)
+
+    @numba.njit(cache=True, nogil=True)
+    def _kepler_drift(q, v, gms, dt):
+        # Row by row copy of kepler.kepler_drift
+        for i in range(q.shape[0]):
+            gm = gms[i]
+            sqrt_gm = np.sqrt(gm)
+            x, y, vx, vy = q[i, 0], q[i, 1], v[i, 0], v[i, 1]
+            r0 = np.sqrt(x * x + y * y)
+            sigma0 = (x * vx + y * vy) / sqrt_gm
+            alpha = 2 / r0 - (vx * vx + vy * vy) / gm
+            t = dt
+            if alpha > 0:
+                t = np.fmod(t, 2 * np.pi / np.sqrt(gm * alpha ** 3))
+                chi = sqrt_gm * t * alpha
+            elif alpha < -1e-12:
+                a = 1 / alpha
+                chi = np.sign(t) * np.sqrt(-a) * np.log(
+                    -2 * gm * alpha * t / (sigma0 * sqrt_gm + np.sign(t) * np.sqrt(-gm * a) * (1 - r0 * alpha)))
+            else:
+                chi = sqrt_gm * t / r0
+            for _ in range(50):
+                z = alpha * chi * chi
+                c, s = _stumpff(z)
+                f = sigma0 * chi * chi * c + (1 - alpha * r0) * chi ** 3 * s + r0 * chi - sqrt_gm * t
+                df = sigma0 * chi * (1 - z * s) + (1 - alpha * r0) * chi * chi * c + r0
+                ddf = sigma0 * (1 - z * c) + (1 - alpha * r0) * chi * (1 - z * s)
+                root = np.sqrt(abs(16 * df * df - 20 * f * ddf))
+                delta = 5 * f / (df + (root if df >= 0 else -root))
+                chi -= delta
+                if abs(delta) <= 1e-13 * abs(chi):
+                    break
+            z = alpha * chi * chi
+            c, s = _stumpff(z)
+            f = 1 - chi * chi / r0 * c
+            g = t - chi ** 3 / sqrt_gm * s
+            nx, ny = f * x + g * vx, f * y + g * vy
+            r = np.sqrt(nx * nx + ny * ny)
+            f_dot = sqrt_gm / (r * r0) * (z * s - 1) * chi
+            g_dot = 1 - chi * chi / r * c
+            q[i, 0], q[i, 1] = nx, ny
+            v[i, 0], v[i, 1] = f_dot * x + g_dot * vx, f_dot * y + g_dot * vy
+
+    @numba.njit(cache=True, nogil=True)
+    def _wisdom_holman_kick(q, v, h, mass, eps2, center_eps2, gm):
+        # Pull between the non-central bodies, plus the softened part of the central pull
+        for i in range(q.shape[0]):
+            ax = 0.0
+            ay = 0.0
+            for j in range(q.shape[0]):
+                if mass[j] == 0.0:
+                    continue
+                dx = q[j, 0] - q[i, 0]
+                dy = q[j, 1] - q[i, 1]
+                r2 = dx * dx + dy * dy
+                if r2 > 0.0:
+                    r2 += (eps2[i] + eps2[j]) / 2
+                    w = G * mass[j] / (r2 * np.sqrt(r2))
+                    ax += w * dx
+                    ay += w * dy
+            if center_eps2[i] > 0.0:
+                r2 = q[i, 0] ** 2 + q[i, 1] ** 2
+                soft = r2 + center_eps2[i]
+                w = gm * (1 / (r2 * np.sqrt(r2)) - 1 / (soft * np.sqrt(soft)))
+                ax += w * q[i, 0]
+                ay += w * q[i, 1]
+            v[i, 0] += ax * h
+            v[i, 1] += ay * h
+
+    @numba.njit(cache=True, nogil=True)
+    def _wisdom_holman(pos, vel, dt, steps, center, mass, eps2, gm):
+        # Compiled copy of integrators.wisdom_holman with the engine's force model
+        others = np.array([i for i in range(pos.shape[0]) if i != center])
+        m = mass[others]
+        total = mass.sum()
+        com_pos = np.zeros(2)
+        com_vel = np.zeros(2)
+        for i in range(pos.shape[0]):
+            com_pos += mass[i] * pos[i]
+            com_vel += mass[i] * vel[i]
+        com_pos /= total
+        com_vel /= total
+        q = pos[others] - pos[center]
+        v = vel[others] - com_vel
+        other_eps2 = eps2[others]
+        center_eps2 = (eps2[center] + other_eps2) / 2
+        gms = np.full(len(others), gm)
+        for _ in range(steps):
+            _wisdom_holman_kick(q, v, dt / 2, m, other_eps2, center_eps2, gm)
+            q += (m[:, None] * v).sum(axis=0) * (dt / 2 / mass[center])
+            _kepler_drift(q, v, gms, dt)
+            q += (m[:, None] * v).sum(axis=0) * (dt / 2 / mass[center])
+            _wisdom_holman_kick(q, v, dt / 2, m, other_eps2, center_eps2, gm)
+        com_pos += com_vel * (dt * steps)
+        pos[center] = com_pos - (m[:, None] * q).sum(axis=0) / total
+        vel[center] = com_vel - (m[:, None] * v).sum(axis=0) / mass[center]
+        pos[others] = q + pos[center]
+        vel[others] = v + com_vel
+
+    _SOURCE_INTEGRATORS = _make_integrators(_source_accelerations)
+    _CENTRAL_INTEGRATORS = _make_integrators(_central_accelerations)
+    _NO_INDEX = np.zeros(0, dtype=np.int64)
+
+
+def direct_accelerations(targets, pos, mass, target_eps2=0.0, eps2=0.0):
+    """barnes_hut.direct_accelerations on the active backend."""
+    if BACKEND == "numpy":
+        return numpy_direct_accelerations(targets, pos, mass, target_eps2, eps2)
+    return _direct_accelerations(np.ascontiguousarray(targets, dtype=float),
+                                 np.ascontiguousarray(pos, dtype=float), mass,
+                                 np.broadcast_to(np.asarray(target_eps2, dtype=float), len(targets)),
+                                 np.broadcast_to(np.asarray(eps2, dtype=float), len(pos)))
+
+
+def integrate_sources(integrator, pos, vel, mass, eps2, sources, dt, steps):
+    """Integrate in place under the attraction of the source rows (the engine's force model)."""
+    if BACKEND == "numpy":
+        def accel(p):
+            return numpy_direct_accelerations(p, p[sources], mass[sources], eps2, eps2[sources])
+        INTEGRATORS[integrator](pos, vel, dt, steps, accel)
+    else:
+        _SOURCE_INTEGRATORS[integrator](pos, vel, dt, steps, sources.astype(np.int64), mass, eps2)
+
+
+def integrate_central(integrator, rel_pos, rel_vel, gm, eps2, dt, steps):
+    """Integrate in place, each row orbiting the origin with its own gm (the moon force model)."""
+    if BACKEND == "numpy":
+        def accel(p):
+            r2 = np.einsum("ij,ij->i", p, p) + eps2
+            return -gm[:, None] * p / (r2 * np.sqrt(r2))[:, None]
+        INTEGRATORS[integrator](rel_pos, rel_vel, dt, steps, accel)
+    else:
+        _CENTRAL_INTEGRATORS[integrator](rel_pos, rel_vel, dt, steps, _NO_INDEX, gm, eps2)
+
+
+def kepler_drift(rel_pos, rel_vel, gm, dt):
+    """kepler.kepler_drift on the active backend."""
+    if BACKEND == "numpy":
+        numpy_kepler_drift(rel_pos, rel_vel, gm, dt)
+    else:
+        _kepler_drift(rel_pos, rel_vel, np.broadcast_to(np.asarray(gm, dtype=float), len(rel_pos)), dt)
+
+
+def integrate_wisdom_holman(pos, vel, mass, eps2, center, dt, steps):
+    """Wisdom-Holman steps around the row `center`; mass is 0 for rows that attract nothing."""
+    gm = G * mass[center]
+    if BACKEND == "numpy":
+        others = np.flatnonzero(np.arange(len(pos)) != center)
+        attracting = np.flatnonzero(mass[others] > 0)
+        other_eps2 = eps2[others]
+        center_eps2 = (eps2[center] + other_eps2) / 2
+        softened = center_eps2 > 0
+
+        def interactions(rel_pos):
+            a = numpy_direct_accelerations(rel_pos, rel_pos[attracting], mass[others][attracting],
+                                           other_eps2, other_eps2[attracting])
+            # The Kepler drift uses the exact central pull; the softening is applied as a kick
+            q = rel_pos[softened]
+            r2 = np.einsum("ij,ij->i", q, q)
+            soft = r2 + center_eps2[softened]
+            a[softened] += (gm * (1 / (r2 * np.sqrt(r2)) - 1 / (soft * np.sqrt(soft))))[:, None] * q
+            return a
+
+        wisdom_holman(pos, vel, dt, steps, center, mass, gm, interactions)
+    else:
+        _wisdom_holman(pos, vel, dt, steps, center, mass, eps2, gm)
+
+
+def _relative_difference(result, reference):
+    # Largest deviation relative to the largest magnitude, so bodies at the origin are fine
+    return np.max(np.abs(result - reference)) / np.max(np.abs(reference))
+
+
+def compare_backends(steps=2000, dt=3600.0):
+    """(kernel, max relative difference, NumPy time, compiled time) for every kernel."""
+    global BACKEND
+    from solar_system_model import SolarSystemModel, AU
+
+    model = SolarSystemModel.default()
+    model.add_custom_object("giant", 1e27, [3 * AU, 0.0], [0.0, 17000.0])  # Exercises softening and kicks
+    engine, moons = model.engine, model.moon_system
+    n = engine.count
+    sources = np.flatnonzero(engine.is_source[:n])
+    mass = engine.mass[:n]
+    eps2 = engine.softening[:n] ** 2
+    attracting_mass = np.where(engine.is_source[:n], mass, 0.0)
+    planets = (engine.pos[:n], engine.vel[:n])
+    cases = []
+    for name in INTEGRATORS:
+        cases.append((f"{name} planets", planets,
+                      lambda p, v, k, name=name: integrate_sources(name, p, v, mass, eps2, sources, dt, k)))
+        cases.append((f"{name} moons", (moons.rel_pos, moons.rel_vel),
+                      lambda p, v, k, name=name: integrate_central(name, p, v, moons.parent_gm, moons.eps2,
+                                                                   dt / 10, k)))
+    cases.append(("wisdom-holman planets", planets,
+                  lambda p, v, k: integrate_wisdom_holman(p, v, attracting_mass, eps2, 0, 10 * dt, k)))
+
+    rows = []
+    previous = BACKEND
+    try:
+        pos = engine.pos[:n]
+        results = []
+        timings = []
+        for backend in ("numpy", "numba"):
+            BACKEND = backend
+            direct_accelerations(pos, pos[sources], mass[sources], eps2, eps2[sources])  # Warm-up
+            start = time.perf_counter()
+            results.append(direct_accelerations(pos, pos[sources], mass[sources], eps2, eps2[sources]))
+            timings.append(time.perf_counter() - start)
+        rows.append(("direct accelerations", _relative_difference(results[1], results[0]), timings[0], timings[1]))
+
+        for label, (pos, vel), run in cases:
+            results = []
+            timings = []
+            for backend in ("numpy", "numba"):
+                BACKEND = backend
+                p, v = pos.copy(), vel.copy()
+                if backend == "numba":
+                    run(p.copy(), v.copy(), 1)  # Keep compilation out of the timing
+                start = time.perf_counter()
+                run(p, v, steps)
+                timings.append(time.perf_counter() - start)
+                results.append(p)
+            rows.append((label, _relative_difference(results[1], results[0]), timings[0], timings[1]))
+    finally:
+        BACKEND = previous
+    return rows
+
+
+if __name__ == "__main__":
+    print(f"backend: {BACKEND}")
+    if numba is None:
+        print("Numba is not installed, only the NumPy kernels are available")
+        sys.exit(0)
+    worst = 0.0
+    for name, error, numpy_time, compiled_time in compare_backends():
+        print(f"{name:>26}: max relative difference {error:.1e}, {numpy_time / compiled_time:6.1f}x faster")
+        worst = max(worst, error)
+    sys.exit(0 if worst < 1e-9 else 1)
@@ -1,4 +1,4 @@
-import sys, time
+import sys, time, argparse, contextlib
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 from PyQt6.QtWidgets import *
@@ -10,14 +10,41 @@ from overlay import Ui_Overlay as ui
 from Moon import Moon
 from planet_class import PlanetObject as Planet
 from custom_object_class import CustomObject as CustomObject
+from physics_engine import NBodyEngine
+from moon_system import MoonSystem
+from integrators import INTEGRATOR_NAMES
+from physics_engine import advance_system
+from physics_worker import PhysicsWorker
+from frame_clock import FixedTimestepClock
+import kernels
+from escape import EscapePolicy, ESCAPE_MODES
+from ephemeris import EphemerisBuffer
+from chebyshev_ephemeris import ChebyshevEphemeris
+from snapshot import Snapshot, Autosaver
+from trajectory import TrajectoryRecorder, TrajectoryFile
+from archive import TrajectoryArchive
+from solar_system_model import (SolarSystemModel, SUN, PLANETS, MOONS, AU, MASS_UNIT, planet_velocity, moon_velocity,
+                                launch_velocity)
 
 class SolarSystem(QMainWindow):
-    def __init__(self):
+    # Calibration of the on-screen day counter: one day per 21.7 frames' worth of simulated time at speed 1
+    DAYS_PER_SIM_SECOND = 1 / (3 * Planet.TIMESTEP / 120 * 21.7)
+
+    def __init__(self, integrator="euler", timestepping="fixed", propagation="numerical", threaded_physics=False,
+                 max_catch_up_steps=8, collisions="merge", escape="bounds", rewind_years=20, rewind_interval=6 * 3600,
+                 chebyshev=None, snapshot_path="solar_system.snap", autosave_interval=0.0, record=None,
+                 record_cadence=86400.0, replay=None, replay_loop=False):
         super().__init__()
 
         self.planets = []
         self.moons = []
         self.custom_objects = []
+        if isinstance(escape, str):
+            escape = EscapePolicy(escape)  # Custom objects leaving the scene are retired
+        self.engine = NBodyEngine(integrator=integrator, timestepping=timestepping, propagation=propagation,
+                                  collisions=collisions, escape=escape)  # Holds the physical state of planets and custom objects
+        self.moon_system = MoonSystem(integrator=integrator, timestepping=timestepping)  # Holds the orbits of all moons relative to their planets
+        self.physics_worker = None  # Set when physics runs on a background thread
         self.base_sim_speed = 0.1  # Base multiplier for simulation speed # Small physics timestep in seconds (for accuracy)
         self.simulation_speed = self.base_sim_speed
         self.simulation_days = 0  # Tracks total simulation time in days
@@ -31,6 +58,31 @@ class SolarSystem(QMainWindow):
         self.nextclick = False
         self.dir_click = False
         self.performance_mode_active = False
+        self.conic_objects = False  # New custom objects are patched-conic probes
+        # Recent planet and moon states for rewinding with the negative half of the time slider
+        self.ephemeris = EphemerisBuffer(len(self.planets), len(MOONS), rewind_interval,
+                                         rewind_years * 365.25 / self.DAYS_PER_SIM_SECOND)
+        self.review_time = None  # Simulated time shown while looking at recorded states
+        self.rewind_years = rewind_years
+        # Precomputed planet and moon positions; used instead of integrating while there are no custom objects
+        if isinstance(chebyshev, str):
+            chebyshev = ChebyshevEphemeris(chebyshev)
+        if chebyshev is not None and chebyshev.names != [planet.name for planet in self.planets] + [m[0] for m in MOONS]:
+            print("Chebyshev ephemeris does not match the solar system, integrating instead")
+            chebyshev = None
+        self.chebyshev = chebyshev
+        # F5 saves and F9 loads snapshot_path; with an autosave_interval, autosaves go there every that many
+        # wall-clock seconds (off by default, so running the game writes no files of its own)
+        self.snapshot_path = snapshot_path
+        self.autosave_interval = autosave_interval
+        self.autosaver = None
+        if autosave_interval > 0 and replay is None:
+            self.autosaver = Autosaver(snapshot_path)
+            self.autosaver.start()
+        self.next_autosave = time.time() + autosave_interval
+        self.initial_state = Snapshot.capture(self.engine, self.moon_system)  # What the rerun button goes back to
+        # Trajectories of every body, written to a memory-mapped file others can read while it grows
+        self.recorder = None if record is None else TrajectoryRecorder(record, record_cadence)
 
 
         self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
@@ -40,7 +92,9 @@ class SolarSystem(QMainWindow):
           # Actual simulation speed multiplier (adjustable via slider)
 
         # Timing for update loop and FPS calculation
-        self.last_update_time = time.time()  # For physics accumulator
+        self.clock = FixedTimestepClock(1 / 120, max_catch_up_steps)  # Physics accumulator driven by wall time
+        self.previous_pos = None  # Engine and moon state before the last physics step, for interpolation
+        self.previous_moon_pos = None
         self.last_frame_time = time.time()     # For FPS calculation
         self.fps_counter = 0
         self.fps_accumulator = 0.0
@@ -50,6 +104,18 @@ class SolarSystem(QMainWindow):
         self.timer.timeout.connect(self.update)
         self.timer.start(8)  # alle 8 ms --> max 125 FPS
 
+        # Playback of a recorded trajectory file; nothing is integrated while replaying
+        self.replay = None
+        self.replay_loop = replay_loop
+        if replay is not None:
+            self.start_replay(replay)
+
+        # Optional background physics; the frame loop then only renders its snapshots
+        if threaded_physics and self.replay is None:
+            self.physics_worker = PhysicsWorker(self.engine, self.moon_system, self.clock.step, max_catch_up_steps)
+            self.physics_worker.start()
+        self.clock.reset()
+
         self.is_following = False  # Flag to track if following a planet
         self.following_planet = None
 
@@ -177,33 +243,26 @@ class SolarSystem(QMainWindow):
     def initialize_planets(self):
         # Add the Sun at the origin
         initial_x, initial_y = 0, 0
-        sun = Planet("sun", 1.989e30, self.scene, initial_x, initial_y, 400, "NORMAL", "sun.svg", self)
+        name, mass, size, texture_path = SUN
+        sun = Planet(name, mass, self.scene, initial_x, initial_y, size, "NORMAL", texture_path, self)
         self.planets.append(sun)
+        self.engine.add_body(sun, source=True)
 
-        self.add_planet("mercury", 3.3011e23, 0.39 + Planet.SCALE / 10000, 0, 80, "SCALE", "mercury.svg", sun)
-        self.add_planet("venus", 4.867e24, 0.72 + Planet.SCALE / 10000, 0, 130, "SCALE", "venus.svg", sun)
-        self.add_planet("earth", 5.9722e24, 1 + Planet.SCALE / 10000, 0, 150, "SCALE", "earth.svg", sun)
-        self.add_planet("mars", 6.417e23, 1.52 + Planet.SCALE / 10000, 0, 130, "SCALE", "mars.svg", sun)
-        self.add_planet("jupiter", 1.898e27, 5.2, 0, 180, "HIGHSCALE", "jupiter.svg", sun)
-        self.add_planet("saturn", 5.683e26, 9.54, 0, 370, "HIGHSCALE", "saturn.svg", sun) # extra größer weil grafik vergleichsweise kleiner (wegen den ringen)
-        self.add_planet("uranus", 8.681e25, 19.22, 0, 340, "HIGHSCALE", "uranus.svg", sun)
-        self.add_planet("neptune", 1.024e26, 30.1, 0, 150, "HIGHSCALE", "neptune.svg", sun)
+        for name, mass, x, size, scaletype, texture_path in PLANETS:
+            self.add_planet(name, mass, x, 0, size, scaletype, texture_path, sun)
 
         self.add_moons()
 
 
+    def physics_lock(self):
+        # Adding or removing bodies must not race with the physics worker
+        if self.physics_worker is None:
+            return contextlib.nullcontext()
+        return self.physics_worker.lock
+
     def add_moons(self) -> object:
-        self.add_moon("moon", 7.346e22, 0.0026, 0, 20, "moon.svg", self.planets[3])
-        self.add_moon("ganymed", 1.4819e23, 0.0071, 0, 30, "moon.svg", self.planets[5])
-        self.add_moon("io", 8.931e22, 0.0028, 0, 25, "moon.svg", self.planets[5])
-        self.add_moon("europa", 4.8e22, 0.0045, 0, 18, "moon.svg", self.planets[5])
-        self.add_moon("titan", 1.345e23, 0.00817, 0, 28, "moon.svg", self.planets[6])
-        self.add_moon("triton", 2.14e22, 0.0024, 0, 18, "moon.svg", self.planets[8])
-        self.add_moon("titania", 3.46e21, 0.0018, 0, 20, "moon.svg", self.planets[7])
-        self.add_moon("oberon", 3.11e21, 0.0039, 0, 23, "moon.svg", self.planets[7])
-        self.add_moon("umbriel", 1.17e21, 0.00178, 0, 15, "moon.svg", self.planets[7])
-        self.add_moon("rhea", 2.31e21, 0.0035, 0, 18, "moon.svg", self.planets[6])
-        self.add_moon("dione", 1.1e21, 0.0025, 0, 20, "moon.svg", self.planets[6])
+        for name, mass, x, size, parent in MOONS:
+            self.add_moon(name, mass, x, 0, size, "moon.svg", self.planets[parent])
 
         self.moons_active = True
 
@@ -214,16 +273,11 @@ class SolarSystem(QMainWindow):
         effective_distance_pixels = effective_distance_AU * Planet.SCALE
         planet.setPos(effective_distance_pixels, 0)
 
-        # Compute orbital velocity around the Sun (using pixels-to-meters conversion)
-        r_pixels = np.linalg.norm(np.array([planet.x() - sun.x(), planet.y() - sun.y()]))
-        r_meters = r_pixels * Planet.METER_PER_PIXEL
-        orbital_velocity = math.sqrt(Planet.G * sun.mass / r_meters)
-        radial_vector = np.array([planet.x() - sun.x(), planet.y() - sun.y()])
-        radial_unit = radial_vector / np.linalg.norm(radial_vector)
-        tangential_unit = np.array([-radial_unit[1], radial_unit[0]])
-        planet.velocity = orbital_velocity * tangential_unit
+        # Orbital velocity around the Sun at the on-screen distance
+        planet.velocity = planet_velocity(x, sun.size, sun.mass)
 
         self.planets.append(planet)
+        self.engine.add_body(planet)
 
     def add_moon(self, name, mass, x, y, size, texture_path, planet):
         moon = Moon(name, mass, self.scene, x, y, size, texture_path, planet)
@@ -231,13 +285,11 @@ class SolarSystem(QMainWindow):
         moon.sim_pos = planet.sim_pos + np.array([x * moon.AU, y * moon.AU])
         moon.rel_pos = np.array([x * moon.AU, y * moon.AU])
         moon.setPos(moon.sim_pos[0] / moon.METER_PER_PIXEL, moon.sim_pos[1] / moon.METER_PER_PIXEL)
-        r_meters = np.linalg.norm(moon.rel_pos)
-        orbital_velocity = math.sqrt(moon.G * planet.mass / r_meters)
-        radial_unit = moon.rel_pos / np.linalg.norm(moon.rel_pos)
-        tangential_unit = np.array([-radial_unit[1], radial_unit[0]])
-        moon.rel_velocity = orbital_velocity * tangential_unit
+        moon.rel_velocity = moon_velocity(moon.rel_pos, planet.mass)
         moon.velocity = planet.velocity + moon.rel_velocity
         self.moons.append(moon)
+        with self.physics_lock():
+            self.moon_system.add_moon(moon)
 
     def remove_moons(self):
         self.moons_active = False
@@ -245,6 +297,8 @@ class SolarSystem(QMainWindow):
             self.scene.removeItem(moon)
             self.scene.removeItem(moon.text_item)
         self.moons.clear()
+        with self.physics_lock():
+            self.moon_system.clear()
 
     def create_stars(self):
         for _ in range(12000):
@@ -271,6 +325,10 @@ class SolarSystem(QMainWindow):
 
     def update(self):
         self.update_positions()
+        if self.autosaver is not None and time.time() >= self.next_autosave:
+            # Only the copy happens here; the file is written on the autosave thread
+            self.autosaver.submit(self.capture_snapshot())
+            self.next_autosave = time.time() + self.autosave_interval
         self.base_sim_speed = 1 / (math.sqrt(self.view.zoom_factor))
         if self.ui_obj.CreationModeCheckbox.isChecked():
             self.showNonCreationModeOnly(False)
@@ -346,6 +404,8 @@ class SolarSystem(QMainWindow):
         self.init_y = self.view.mapToScene(QCursor.pos()).y()
 
     def create_object(self, x, y, x_dir, y_dir):
+        if self.replay is not None:
+            return  # Nothing is integrated while replaying
         name_raw = self.ui_obj.lineEditName.text()
         mass_raw = self.ui_obj.lineEditName_2.text()
         size_raw = self.ui_obj.lineEditName_3.text()
@@ -355,22 +415,11 @@ class SolarSystem(QMainWindow):
             return
 
         name = name_raw
-        mass = int(mass_raw) * 1_000_000_000_000_000_000_000_000 #* 10e23
+        mass = int(mass_raw) * MASS_UNIT
         size = int(size_raw)
         speed = int(speed_raw)
 
-        p1 = np.array([x, y])
-        p2 = np.array([x_dir, y_dir])
-
-        # 1) get the vector from p1 to p2
-        direction = p2 - p1
-
-        # 2) normalize to a unit vector
-        dist = np.linalg.norm(direction)
-        if dist == 0:
-            unit = np.zeros(2)  # overlapping points: no movement
-        else:
-            unit = direction / dist
+        velocity = launch_velocity(x, y, x_dir, y_dir, speed)
 
         x = x * (CustomObject.METER_PER_PIXEL / CustomObject.AU)
         y = y * (CustomObject.METER_PER_PIXEL / CustomObject.AU)
@@ -378,9 +427,11 @@ class SolarSystem(QMainWindow):
         new_object = CustomObject(name, mass, self.scene, x, y, size, "object.svg")
 
 
-        new_object.velocity = unit * speed
+        new_object.velocity = velocity
         print(str(new_object.x()))
         self.custom_objects.append(new_object)
+        with self.physics_lock():
+            self.engine.add_body(new_object, source=not self.conic_objects, conic=self.conic_objects)
         self.scene.addItem(new_object)
 
 
@@ -421,6 +472,8 @@ class SolarSystem(QMainWindow):
                 self.ui_obj.WarningText.hide()
                 self.create_panel_shown = False
                 for custom_object in self.custom_objects:
+                    with self.physics_lock():
+                        self.engine.remove_body(custom_object)
                     self.scene.removeItem(custom_object)
                 self.custom_objects.clear()
 
@@ -429,30 +482,55 @@ class SolarSystem(QMainWindow):
     def update_positions(self):
         # Update simulation speed based on slider (multiplier)
 
-        self.simulation_speed = self.base_sim_speed * self.sliderValues[self.timeSlider.value() + 13]
-        self.ui_obj.simulation_speed_text.setText(str(self.sliderValues[self.timeSlider.value() + 13]))
+        # The negative half of the slider runs time backwards at the same speeds
+        value = self.timeSlider.value()
+        speed = self.sliderValues[value + 13] if value >= 0 else -self.sliderValues[13 - value]
+        self.simulation_speed = self.base_sim_speed * speed
+        self.ui_obj.simulation_speed_text.setText(str(speed))
 
-        if self.simulation_speed > 5:
+        if abs(self.simulation_speed) > 5:
             self.remove_moons()
             self.moons_active = False
         elif not self.moons_active and not self.performance_mode_active:
             self.add_moons()
 
-        fixed_dt = 1 / 120 # Assume 60 updates per second
+        fixed_dt = self.clock.step  # Wall-clock seconds per physics step
         physics_update_rate = 3
-        for _ in range(physics_update_rate):
-            dt = fixed_dt * self.simulation_speed
-            for planet in self.planets:
-                planet.update_position(self.planets, self.custom_objects, dt)
-            for custom_object in self.custom_objects:
-                custom_object.update_position(self.planets, self.custom_objects, dt)
-            for _ in range(10):
-                for moon in self.moons:
-                    moon.update_position(dt)
-
-        self.simulation_days += Planet.TIMESTEP / (3600 * 24) * self.simulation_speed / 21.7
-        if self.simulation_days >= (self.years_passed + 1) * 365.25:
-            self.years_passed += 1
+        # Simulated seconds per physics step; higher-order integrators cover it in fewer substeps
+        step_time = physics_update_rate * fixed_dt * self.simulation_speed * Planet.TIMESTEP
+        if self.physics_worker is None:
+            steps = self.clock.tick()
+            if self.replay is not None:
+                self.replay_frame(steps * step_time)
+            elif step_time < 0 or self.review_time is not None:
+                self.review(steps * step_time)
+            else:
+                if self.chebyshev_covers(self.engine.time + steps * step_time):
+                    # Any number of steps costs one evaluation; the previous state is one step earlier
+                    end = self.engine.time + steps * step_time
+                    self.load_chebyshev([end - step_time, end])
+                    self.record_ephemeris()
+                    self.record_trajectory()
+                else:
+                    for i in range(steps):
+                        if i == steps - 1:
+                            self.store_previous_state()
+                        advance_system(self.engine, self.moon_system, step_time)
+                        self.record_ephemeris()
+                        self.record_trajectory()
+                # The scene is only touched once per frame, whatever the step count
+                self.sync_interpolated(self.clock.alpha)
+        else:
+            # Rewinding needs the recorded states, which only the frame loop keeps
+            self.physics_worker.sim_rate = max(step_time, 0) / fixed_dt
+            self.sync_from_snapshot()
+        self.remove_retired()
+
+        shown_time = self.engine.time if self.review_time is None else self.review_time
+        if self.replay is not None:
+            shown_time = self.replay_time
+        self.simulation_days = shown_time * self.DAYS_PER_SIM_SECOND
+        self.years_passed = int(self.simulation_days // 365.25)
         shown_days = self.simulation_days % 365.25
         self.ui_obj.TimeCounter.setText(f"Simulated Time: {self.years_passed} Years" + f" {int(shown_days)} Days")
 
@@ -481,14 +559,383 @@ class SolarSystem(QMainWindow):
         self.fps_accumulator += dt
         if self.fps_accumulator >= 1.0:
             fps = int(round(self.fps_counter / self.fps_accumulator))
-            self.fps_text.setText("FPS: " + str(fps))
+            physics = ""
+            if self.physics_worker is not None:
+                physics = " | Physics: " + str(int(round(self.physics_worker.steps_per_second))) + "/s"
+            self.fps_text.setText("FPS: " + str(fps) + physics + " | " + self.physics_label() + " | " + kernels.BACKEND)
             self.fps_counter = 0
             self.fps_accumulator = 0.0
 
+    def set_integrator(self, name):
+        self.engine.integrator = name
+        self.moon_system.integrator = name
+
+    def advance_years(self, years):
+        # Jump ahead without rendering: the frame loop is suspended while the engine runs in large batches
+        self.timer.stop()
+        progress = QProgressDialog("Advancing simulation...", "Cancel", 0, 1000, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+
+        def report(done, total):
+            progress.setValue(int(1000 * done / total))
+            QApplication.processEvents()
+            return not progress.wasCanceled()
+
+        # Years as shown by the time counter
+        seconds = years * 365.25 / self.DAYS_PER_SIM_SECOND
+        retired = []
+        with self.physics_lock():
+            if self.chebyshev_covers(self.engine.time + seconds):
+                self.load_chebyshev([self.engine.time + seconds])
+            else:
+                model = SolarSystemModel(self.engine, self.moon_system)
+                retired = model.advance(seconds, Planet.TIMESTEP, progress=report, closed_form=True)
+        progress.close()
+        self.retire(retired)
+        # The recorded states would leave a gap of `years`, so rewinding starts over from here
+        self.ephemeris.clear()
+        if self.review_time is not None:
+            self.end_review()
+
+        # Resume normal rendering at the new epoch
+        self.previous_pos = None
+        self.previous_moon_pos = None
+        self.clock.reset()
+        self.timer.start(8)
+
+    def set_timestepping(self, mode):
+        self.engine.timestepping = mode
+        self.moon_system.timestepping = mode
+
+    def physics_label(self):
+        if self.engine.kepler is not None:
+            return "kepler"
+        label = self.engine.integrator
+        if self.engine.timestepping == "block":
+            label += " (block)"
+        if self.conic_objects:
+            label += " | conic probes"
+        return label
+
+    def print_step_counts(self):
+        # Shows where the physics compute goes when block timesteps are active
+        for name, count in self.engine.body_step_counts() + self.moon_system.body_step_counts():
+            print(f"{name:>10}: {count} steps")
+
+    def keyPressEvent(self, event: QKeyEvent):
+        if event.key() == Qt.Key.Key_I:
+            # Cycle through the available integrators at runtime
+            names = INTEGRATOR_NAMES
+            self.set_integrator(names[(names.index(self.engine.integrator) + 1) % len(names)])
+        elif event.key() == Qt.Key.Key_B:
+            # Toggle adaptive per-body block timesteps
+            self.set_timestepping("fixed" if self.engine.timestepping == "block" else "block")
+        elif event.key() == Qt.Key.Key_K:
+            # Closed-form planet orbits whenever the sun is the only attracting body
+            self.engine.propagation = "numerical" if self.engine.propagation == "kepler" else "kepler"
+        elif event.key() == Qt.Key.Key_J and self.replay is not None:
+            years, ok = QInputDialog.getDouble(self, "Seek", "Go to year:", self.years_passed, 0, 10000, 1)
+            if ok:
+                self.seek_replay(years * 365.25 / self.DAYS_PER_SIM_SECOND)
+        elif event.key() == Qt.Key.Key_J:
+            years, ok = QInputDialog.getDouble(self, "Fast forward", "Advance by years:", 10, 0, 10000, 1)
+            if ok:
+                self.advance_years(years)
+        elif event.key() == Qt.Key.Key_L:
+            self.replay_loop = not self.replay_loop
+        elif event.key() == Qt.Key.Key_P:
+            self.print_step_counts()
+        elif event.key() == Qt.Key.Key_C:
+            # New custom objects become patched-conic probes that attract nothing
+            self.conic_objects = not self.conic_objects
+        elif event.key() == Qt.Key.Key_F5:
+            self.capture_snapshot().save(self.snapshot_path)
+        elif event.key() == Qt.Key.Key_F9:
+            try:
+                self.load_snapshot(self.snapshot_path)
+            except (OSError, ValueError) as error:
+                print(f"Could not load {self.snapshot_path}: {error}")
+        else:
+            super().keyPressEvent(event)
+
+    def remove_retired(self):
+        # Custom objects merged into another body by a collision or escaped from the system leave the scene
+        with self.physics_lock():
+            retired = self.engine.take_absorbed() + self.engine.take_escaped()
+        self.retire(retired)
+
+    def retire(self, retired):
+        for body in retired:
+            if body in self.custom_objects:
+                self.custom_objects.remove(body)
+            if self.following_planet is body:
+                self.is_following = False
+                self.following_planet = None
+            self.scene.removeItem(body)
+
+    def capture_snapshot(self):
+        with self.physics_lock():
+            return Snapshot.capture(self.engine, self.moon_system, self.simulation_days, self.years_passed,
+                                    self.custom_objects)
+
+    def load_snapshot(self, path):
+        snapshot = Snapshot.load(path)
+        if self.review_time is not None:
+            self.end_review()
+        with self.physics_lock():
+            # Custom objects are recreated from the snapshot; planets and moons keep their scene items
+            for custom_object in self.custom_objects:
+                if self.following_planet is custom_object:
+                    self.is_following = False
+                    self.following_planet = None
+                self.engine.remove_body(custom_object)
+                self.scene.removeItem(custom_object)
+            self.custom_objects.clear()
+            for row in snapshot.bodies[snapshot.bodies["custom"]]:
+                x, y = row["pos"] / CustomObject.AU
+                name = row["name"].decode("utf-8", "ignore")  # Snapshots of older versions may hold a cut character
+                custom_object = CustomObject(name, row["mass"], self.scene, x, y, row["size"], "object.svg")
+                custom_object.velocity = row["vel"]
+                self.engine.add_body(custom_object, source=row["is_source"], conic=row["on_conic"])
+                self.custom_objects.append(custom_object)
+                self.scene.addItem(custom_object)
+            snapshot.restore(self.engine, self.moon_system)
+        self.simulation_days = float(snapshot.header["simulation_days"])
+        self.years_passed = int(snapshot.header["years_passed"])
+        # The recorded states belong to the session that was replaced
+        self.ephemeris.clear()
+        if self.recorder is not None:
+            self.recorder.truncate(self.engine.time)
+        self.previous_pos = None
+        self.previous_moon_pos = None
+        self.clock.reset()
+        self.sync_interpolated(1.0)
+        if self.custom_objects:
+            # Custom objects only live in creation mode
+            self.ui_obj.CreationModeCheckbox.setChecked(True)
+
+    def record_ephemeris(self):
+        n = len(self.planets)
+        self.ephemeris.record(self.engine.time, self.engine.pos[:n], self.engine.vel[:n], self.moon_system.rel_pos,
+                              self.moon_system.rel_vel)
+
+    def chebyshev_covers(self, time):
+        # Custom objects are not in the ephemeris and their pull would change the planets' orbits
+        return self.chebyshev is not None and not self.custom_objects and self.chebyshev.covers(time)
+
+    def load_chebyshev(self, times):
+        # Set planets and moons to the ephemeris at the last of `times`, keeping the one before for interpolation
+        pos, vel = self.chebyshev.evaluate(times, velocities=True)
+        n = len(self.planets)
+        moons = len(self.moon_system.moons) == len(MOONS)
+        if len(times) > 1:
+            self.previous_pos = pos[-2, :n].copy()
+            self.previous_moon_pos = pos[-2, n:].copy() if moons else None
+        self.engine.pos[:n] = pos[-1, :n]
+        self.engine.vel[:n] = vel[-1, :n]
+        self.engine.time = times[-1]
+        self.engine.kepler = None
+        if moons:
+            self.moon_system.rel_pos[:] = pos[-1, n:]
+            self.moon_system.rel_vel[:] = vel[-1, n:]
+
+    def record_trajectory(self, snapshot=None):
+        # From the live engine, or from the physics worker's latest snapshot
+        if self.recorder is None:
+            return
+        if snapshot is None:
+            n = self.engine.count
+            self.recorder.record(self.engine.time, self.engine.bodies, self.engine.pos[:n], self.engine.vel[:n],
+                                 self.moon_system.moons, self.moon_system.rel_pos, self.moon_system.rel_vel,
+                                 self.custom_objects)
+        else:
+            self.recorder.record(snapshot.time, snapshot.bodies, snapshot.pos, snapshot.vel, snapshot.moons,
+                                 snapshot.moon_rel_pos, snapshot.moon_rel_vel, self.custom_objects)
+
+    def start_replay(self, path):
+        try:
+            self.replay = TrajectoryFile(path)
+        except ValueError:
+            self.replay = TrajectoryArchive(path)  # Compressed archives play the same way
+        self.replay_time = self.replay.start
+        self.replay_objects = {}  # Slot -> CustomObject shown for a recorded custom object
+        self.map_replay_slots()
+        self.show_replay()
+
+    def map_replay_slots(self):
+        # Scene items for the bodies in the file, matched by name; recorded custom objects get new items
+        replay = self.replay
+        planets = {planet.name: planet for planet in self.planets}
+        self.replay_planets = []
+        self.replay_moons = {}  # Moon name -> (slot, slot of its planet)
+        for slot, (name, kind) in enumerate(zip(replay.names, replay.kinds)):
+            if kind == "planet" and name in planets:
+                self.replay_planets.append((slot, planets[name]))
+            elif kind == "moon":
+                self.replay_moons[name] = (slot, replay.parents[slot])
+            elif kind == "custom" and slot not in self.replay_objects:
+                custom_object = CustomObject(name, replay.masses[slot], self.scene, 0, 0,
+                                             replay.sizes[slot], "object.svg")
+                self.scene.addItem(custom_object)
+                self.replay_objects[slot] = custom_object
+        self.replay_slots = len(replay.names)
+
+    def replay_frame(self, seconds):
+        # Play at the slider speed, backwards too; a file that is still being recorded keeps growing
+        replay = self.replay
+        target = self.replay_time + seconds
+        if target > replay.end:
+            replay.refresh()
+            if len(replay.names) != self.replay_slots:
+                self.map_replay_slots()
+        if self.replay_loop and replay.end > replay.start and not replay.start <= target <= replay.end:
+            target = replay.start + (target - replay.start) % (replay.end - replay.start)
+        self.seek_replay(target)
+
+    def seek_replay(self, time):
+        self.replay_time = min(max(time, self.replay.start), self.replay.end)
+        self.show_replay()
+
+    def show_replay(self):
+        pos = self.replay.positions_at(self.replay_time)
+        for slot, planet in self.replay_planets:
+            if np.isfinite(pos[slot]).all():
+                planet.sim_pos = pos[slot]
+        for i, moon in enumerate(self.moon_system.moons):
+            slot, parent = self.replay_moons.get(moon.name, (-1, -1))
+            if slot >= 0 and np.isfinite(pos[slot]).all() and np.isfinite(pos[parent]).all():
+                self.moon_system.rel_pos[i] = pos[slot] - pos[parent]
+        self.previous_pos = None
+        self.previous_moon_pos = None
+        self.sync_interpolated(1.0)
+        for slot, custom_object in self.replay_objects.items():
+            # Only shown while the object existed
+            present = bool(np.isfinite(pos[slot]).all())
+            custom_object.setVisible(present)
+            if present:
+                custom_object.sync_position(pos[slot])
+
+    def review(self, seconds):
+        # Show recorded states instead of integrating: backwards while the slider is negative,
+        # forwards again until the live state is reached
+        if self.ephemeris.count == 0:
+            return
+        if self.review_time is None:
+            self.review_time = self.engine.time
+            for custom_object in self.custom_objects:
+                custom_object.setVisible(False)  # Their history is not recorded
+        self.review_time = min(max(self.review_time + seconds, self.ephemeris.start), self.engine.time)
+        if seconds > 0 and not self.custom_objects:
+            # Planets and moons are all there is, so the simulation can carry on from the past
+            self.restore_ephemeris(self.review_time)
+        if seconds > 0 and self.review_time >= self.engine.time:
+            self.end_review()
+            return
+        pos, moon_pos = self.ephemeris.state_at(self.review_time)
+        for planet, sim_pos in zip(self.planets, pos):
+            planet.sync_position(sim_pos)
+        if len(self.moons) == len(moon_pos) and not np.isnan(moon_pos).any():
+            for moon, rel_pos in zip(self.moons, moon_pos):
+                moon.sync_position(rel_pos)
+
+    def restore_ephemeris(self, time):
+        # Branch off: the engine restarts from the last recorded state at or before `time`
+        sample_time, pos, vel, moon_pos, moon_vel = self.ephemeris.sample(time)
+        n = len(self.planets)
+        self.engine.pos[:n] = pos
+        self.engine.vel[:n] = vel
+        self.engine.time = sample_time
+        self.engine.kepler = None
+        if len(self.moon_system.moons) == len(moon_pos) and not np.isnan(moon_pos).any():
+            self.moon_system.rel_pos[:] = moon_pos
+            self.moon_system.rel_vel[:] = moon_vel
+        self.ephemeris.truncate(sample_time)
+        if self.recorder is not None:
+            self.recorder.truncate(sample_time)
+        self.review_time = sample_time
+
+    def end_review(self):
+        self.review_time = None
+        for custom_object in self.custom_objects:
+            custom_object.setVisible(True)
+        self.previous_pos = None
+        self.previous_moon_pos = None
+        self.clock.reset()
+
+    def store_previous_state(self):
+        self.previous_pos = self.engine.pos[:self.engine.count].copy()
+        self.previous_moon_pos = self.moon_system.rel_pos.copy()
+
+    def sync_interpolated(self, alpha):
+        # Render between the last two physics states so motion stays smooth at any frame rate
+        pos = self.engine.pos[:self.engine.count]
+        if self.previous_pos is not None and self.previous_pos.shape == pos.shape:
+            pos = self.previous_pos + alpha * (pos - self.previous_pos)
+        for body, sim_pos in zip(self.engine.bodies, pos):
+            body.sync_position(sim_pos)
+
+        moon_pos = self.moon_system.rel_pos
+        if self.previous_moon_pos is not None and self.previous_moon_pos.shape == moon_pos.shape:
+            moon_pos = self.previous_moon_pos + alpha * (moon_pos - self.previous_moon_pos)
+        for moon, rel_pos in zip(self.moon_system.moons, moon_pos):
+            moon.sync_position(rel_pos)
+
+    def sync_from_snapshot(self):
+        snapshot = self.physics_worker.latest()
+        if snapshot is None:
+            return
+        # Bodies removed since the snapshot was taken are no longer in the scene
+        for body, sim_pos in zip(snapshot.bodies, snapshot.pos):
+            if body.engine is self.engine:
+                body.sync_position(sim_pos)
+        for moon, rel_pos in zip(snapshot.moons, snapshot.moon_rel_pos):
+            if moon.moon_system is self.moon_system:
+                moon.sync_position(rel_pos)
+        self.record_trajectory(snapshot)
+
+    def closeEvent(self, event):
+        if self.physics_worker is not None:
+            self.physics_worker.stop()
+        if self.autosaver is not None:
+            self.autosaver.submit(self.capture_snapshot())
+            self.autosaver.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+        super().closeEvent(event)
+
     def rerunSimulation(self):
-        self.close()
-        window = SolarSystem()
-        window.show()
+        if self.replay is not None:
+            self.seek_replay(self.replay.start)
+            return
+        # Start over in place: the scene, stars and textures are kept and only the state is reset
+        if self.review_time is not None:
+            self.end_review()
+        self.is_following = False
+        self.following_planet = None
+        self.updatePanelStatus(True)
+        self.remove_retired()
+        with self.physics_lock():
+            for custom_object in self.custom_objects:
+                self.engine.remove_body(custom_object)
+                self.scene.removeItem(custom_object)
+            self.custom_objects.clear()
+            self.engine.collision_count = 0
+            self.engine.conic_switches = 0
+            self.initial_state.restore(self.engine, self.moon_system)
+        self.simulation_days = 0
+        self.years_passed = 0
+        self.ephemeris.clear()
+        if self.recorder is not None:
+            self.recorder.truncate(0.0)
+        self.timeSlider.setValue(0)
+        self.view.resetTransform()
+        self.view.zoom_factor = 1.0
+        self.view.centerOn(0, 0)
+        self.previous_pos = None
+        self.previous_moon_pos = None
+        self.clock.reset()
+        self.sync_interpolated(1.0)
 
     def updateInfoText(self, index, following_planet):
         self.ui_obj.ObjectAttributeLabel.setText(self.ObjectAttributeList[index])
@@ -734,7 +1181,42 @@ class ZoomableView(QGraphicsView):
             super().mouseReleaseEvent(event)
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = SolarSystem()
+    parser = argparse.ArgumentParser(description="Solar System Simulation")
+    parser.add_argument("--integrator", choices=INTEGRATOR_NAMES, default="euler")
+    parser.add_argument("--timestepping", choices=["fixed", "block"], default="fixed")
+    parser.add_argument("--propagation", choices=["numerical", "kepler"], default="numerical")
+    parser.add_argument("--physics-thread", action="store_true", help="step physics on a background thread")
+    parser.add_argument("--max-catch-up", type=int, default=8, help="most physics steps run in one frame")
+    parser.add_argument("--collisions", choices=["merge", "bounce", "off"], default="merge",
+                        help="what custom objects do when they touch another body")
+    parser.add_argument("--escape", choices=ESCAPE_MODES + ["off"], default="bounds",
+                        help="when custom objects are retired as escaped")
+    parser.add_argument("--escape-distance", type=float, default=None, help="escape limit in AU")
+    parser.add_argument("--escape-log", default=None, help="CSV file that records escaped objects")
+    parser.add_argument("--rewind-years", type=float, default=20, help="simulated years kept for rewinding")
+    parser.add_argument("--rewind-interval", type=float, default=6, help="hours between recorded states")
+    parser.add_argument("--chebyshev", default=None,
+                        help="ephemeris file from chebyshev_ephemeris.py to play planets and moons from")
+    parser.add_argument("--snapshot", default="solar_system.snap", help="file for F5/F9 and autosave snapshots")
+    parser.add_argument("--autosave", type=float, default=0,
+                        help="seconds between autosaves to the snapshot file, 0 (default) to disable")
+    parser.add_argument("--restore", action="store_true", help="start from the snapshot file")
+    parser.add_argument("--record", default=None, help="trajectory file that records every body while running")
+    parser.add_argument("--record-cadence", type=float, default=24, help="simulated hours between records")
+    parser.add_argument("--replay", default=None,
+                        help="play a recorded trajectory file or archive instead of simulating")
+    parser.add_argument("--replay-loop", action="store_true", help="start the replay over at its end")
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+    escape = None
+    if args.escape != "off":
+        escape = EscapePolicy(args.escape, None if args.escape_distance is None else args.escape_distance * AU,
+                              args.escape_log)
+    window = SolarSystem(args.integrator, args.timestepping, args.propagation, args.physics_thread,
+                         args.max_catch_up, None if args.collisions == "off" else args.collisions, escape,
+                         args.rewind_years, args.rewind_interval * 3600, args.chebyshev, args.snapshot, args.autosave,
+                         args.record, args.record_cadence * 3600, args.replay, args.replay_loop)
+    if args.restore:
+        window.load_snapshot(args.snapshot)
     window.show()
     sys.exit(app.exec())
@@ -0,0 +1,135 @@
+import numpy as np
+import kernels
+from block_timestep import BlockTimestepper
+from kepler import KeplerOrbits, kepler_drift
+
+G = 6.67428e-11
+
+
+class SatelliteBody:
+    """Mixin for moons whose orbit relative to the parent lives in a MoonSystem row."""
+    moon_system = None
+    moon_index = -1
+    SOFTENING = 0.0  # Plummer softening length [m], set per body class
+
+    @property
+    def rel_pos(self):
+        if self.moon_system is None:
+            return self._rel_pos
+        return self.moon_system.rel_pos[self.moon_index]
+
+    @rel_pos.setter
+    def rel_pos(self, value):
+        if self.moon_system is None:
+            self._rel_pos = np.array(value, dtype=float)
+        else:
+            self.moon_system.rel_pos[self.moon_index] = value
+
+    @property
+    def rel_velocity(self):
+        if self.moon_system is None:
+            return self._rel_velocity
+        return self.moon_system.rel_vel[self.moon_index]
+
+    @rel_velocity.setter
+    def rel_velocity(self, value):
+        if self.moon_system is None:
+            self._rel_velocity = np.array(value, dtype=float)
+        else:
+            self.moon_system.rel_vel[self.moon_index] = value
+
+    @property
+    def sim_pos(self):
+        return self.planet.sim_pos + self.rel_pos
+
+    @sim_pos.setter
+    def sim_pos(self, value):
+        self.rel_pos = np.asarray(value, dtype=float) - self.planet.sim_pos
+
+
+class MoonSystem:
+    """Advances every moon's orbit around its parent planet in one vectorized kernel.
+
+    Moons only feel their parent, so the relative motion does not depend on
+    where the planet is. The rows are grouped by parent planet; each moon
+    stores the gravitational parameter of its parent.
+    """
+
+    def __init__(self, integrator="euler", timestepping="fixed"):
+        self.integrator = integrator
+        self.timestepping = timestepping
+        self.block_stepper = BlockTimestepper()
+        self.rel_pos = np.zeros((0, 2))
+        self.rel_vel = np.zeros((0, 2))
+        self.parent_gm = np.zeros(0)
+        self.eps2 = np.zeros(0)  # Squared softening length of every moon-parent pair
+        self.step_counts = np.zeros(0, dtype=np.int64)  # Steps taken per moon
+        self.moons = []
+
+    def add_moon(self, moon):
+        # Keep moons of the same planet next to each other
+        index = len(self.moons)
+        for i, other in enumerate(self.moons):
+            if other.planet is moon.planet:
+                index = i + 1
+        rel_pos, rel_vel = moon.rel_pos, moon.rel_velocity
+        self.rel_pos = np.insert(self.rel_pos, index, rel_pos, axis=0)
+        self.rel_vel = np.insert(self.rel_vel, index, rel_vel, axis=0)
+        self.parent_gm = np.insert(self.parent_gm, index, G * moon.planet.mass)
+        self.eps2 = np.insert(self.eps2, index, (moon.SOFTENING ** 2 + moon.planet.SOFTENING ** 2) / 2)
+        self.step_counts = np.insert(self.step_counts, index, 0)
+        self.moons.insert(index, moon)
+        for i in range(index, len(self.moons)):
+            self.moons[i].moon_system = self
+            self.moons[i].moon_index = i
+
+    def clear(self):
+        for moon in self.moons:
+            rel_pos, rel_vel = moon.rel_pos.copy(), moon.rel_velocity.copy()
+            moon.moon_system = None
+            moon.moon_index = -1
+            moon.rel_pos = rel_pos
+            moon.rel_velocity = rel_vel
+        self.__init__(self.integrator, self.timestepping)
+
+    def accelerations(self, rel_pos, targets=None):
+        gm, eps2 = self.parent_gm, self.eps2
+        if targets is not None:
+            rel_pos, gm, eps2 = rel_pos[targets], gm[targets], eps2[targets]
+        r2 = np.einsum("ij,ij->i", rel_pos, rel_pos) + eps2
+        return -gm[:, None] * rel_pos / (r2 * np.sqrt(r2))[:, None]
+
+    def jerks(self, rel_pos, rel_vel):
+        r2 = (np.einsum("ij,ij->i", rel_pos, rel_pos) + self.eps2)[:, None]
+        rv = np.einsum("ij,ij->i", rel_pos, rel_vel)[:, None]
+        return -self.parent_gm[:, None] * (rel_vel - 3 * rv / r2 * rel_pos) / (r2 * np.sqrt(r2))
+
+    def step(self, dt, substeps=1):
+        """Advance all moons by `substeps` integrator steps of dt seconds."""
+        if not self.moons:
+            return
+        if self.timestepping == "block":
+            self.step_counts += self.block_stepper.advance(
+                self.rel_pos, self.rel_vel, dt * substeps, self.accelerations, self.jerks)
+        elif self.integrator == "wisdom-holman":
+            # A moon only feels its parent, so the Kepler drift alone is exact
+            kepler_drift(self.rel_pos, self.rel_vel, self.parent_gm, dt * substeps)
+            self.step_counts += substeps
+        else:
+            kernels.integrate_central(self.integrator, self.rel_pos, self.rel_vel, self.parent_gm, self.eps2,
+                                      dt, substeps)
+            self.step_counts += substeps
+
+    def propagate_kepler(self, interval):
+        """Jump all moons ahead in closed form; exact because each moon only feels its parent."""
+        if not self.moons:
+            return
+        orbits = KeplerOrbits(self.rel_pos, self.rel_vel, self.parent_gm)
+        if orbits.bound:
+            self.rel_pos[:], self.rel_vel[:] = orbits.states(interval)
+        else:
+            self.step(interval / 1000, 1000)
+
+    def body_step_counts(self):
+        """(name, steps taken) per moon."""
+        return [(moon.name, int(count)) for moon, count in zip(self.moons, self.step_counts)]
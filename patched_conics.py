@@ -0,0 +1,22 @@
+import numpy as np
+
+# Patched conics: a probe coasts on a two-body orbit around a single reference
+# body, the one whose sphere of influence it is in. The reference body only
+# changes when the probe crosses a sphere-of-influence boundary.
+
+
+def spheres_of_influence(pos, mass, center):
+    """Laplace sphere-of-influence radius of every body around the central body (inf for that one)."""
+    r = np.sqrt(np.einsum("ij,ij->i", pos - pos[center], pos - pos[center]))
+    soi = r * (mass / mass[center]) ** 0.4
+    soi[center] = np.inf
+    return soi
+
+
+def reference_bodies(probe_pos, pos, soi, center):
+    """Index of the body each probe is bound to: the innermost sphere of influence it is inside."""
+    diff = probe_pos[:, None, :] - pos[None, :, :]
+    distance = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+    smallest = np.where(distance < soi[None, :], soi[None, :], np.inf)
+    inside_any = np.isfinite(smallest.min(axis=1, initial=np.inf))
+    return np.where(inside_any, np.argmin(smallest, axis=1), center)
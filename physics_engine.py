@@ -0,0 +1,528 @@
+import sys
+import time
+import numpy as np
+import kernels
+import collisions
+from barnes_hut import QuadTree
+from integrators import INTEGRATORS, SUBSTEPS
+from block_timestep import BlockTimestepper
+from kepler import KeplerOrbits
+from patched_conics import spheres_of_influence, reference_bodies
+
+G = 6.67428e-11
+ENCOUNTER_CHECK = 16  # Steps between close-encounter checks (and sphere-of-influence checks)
+ENCOUNTER_HILL_RADII = 3  # Pairs closer than this many mutual Hill radii are in a close encounter
+ENCOUNTER_PERICENTRE = 0.1  # Plunges count once a step exceeds this fraction of the free-fall time at pericentre
+
+
+class EngineBody:
+    """Mixin for scene items whose physical state lives in an NBodyEngine row.
+
+    Until the body is added to an engine, sim_pos and velocity are plain
+    attributes. Afterwards they are views into the engine arrays.
+    """
+    engine = None
+    engine_index = -1
+    SOFTENING = 0.0  # Plummer softening length [m], set per body class
+    COLLIDES = False  # Whether collisions with this body are detected, set per body class
+    ESCAPES = False  # Whether the body is retired once it leaves the system, set per body class
+    radius = 0.0  # Collision radius [m]
+
+    @property
+    def sim_pos(self):
+        if self.engine is None:
+            return self._sim_pos
+        return self.engine.pos[self.engine_index]
+
+    @sim_pos.setter
+    def sim_pos(self, value):
+        if self.engine is None:
+            self._sim_pos = np.array(value, dtype=float)
+        else:
+            self.engine.pos[self.engine_index] = value
+
+    @property
+    def velocity(self):
+        if self.engine is None:
+            return self._velocity
+        return self.engine.vel[self.engine_index]
+
+    @velocity.setter
+    def velocity(self, value):
+        if self.engine is None:
+            self._velocity = np.array(value, dtype=float)
+        else:
+            self.engine.vel[self.engine_index] = value
+
+
+class NBodyEngine:
+    """Structure-of-arrays N-body integrator.
+
+    Positions, velocities and masses of all bodies are kept in contiguous
+    arrays, and the accelerations for a step are computed in one vectorized
+    pass. Only "source" bodies (the sun and custom objects) attract others,
+    which matches the force model the scene objects used before.
+
+    force_solver selects between the exact "direct" sum and an opt-in
+    "barnes-hut" quadtree with opening angle theta for large populations.
+    integrator names one of integrators.INTEGRATOR_NAMES and may be changed
+    between steps. "wisdom-holman" moves every body along its exact conic
+    around the heaviest source and only integrates the remaining
+    interactions, which allows steps of a sizeable fraction of an orbit.
+    With timestepping="block" each body instead gets its own power-of-two
+    fraction of the step interval (see BlockTimestepper).
+
+    With propagation="kepler", a system with a single attracting body is
+    advanced in closed form (see KeplerOrbits). As soon as a second source
+    such as a custom object appears, the engine integrates numerically again.
+
+    Bodies added with conic=True are patched-conic probes: they attract
+    nothing and coast on an exact conic around the body whose sphere of
+    influence they are in (the heaviest body outside of every other sphere).
+    The reference body is re-checked every ENCOUNTER_CHECK steps, so probes
+    stay accurate at any step size.
+
+    Forces are Plummer-softened with each body's SOFTENING length. Close
+    encounters involving custom objects (pairs within ENCOUNTER_HILL_RADII
+    mutual Hill radii, and plunges toward the central body whose pericentre
+    the step cannot resolve) are regularized in fixed timestepping by
+    splitting the step until it resolves the pair's free-fall time by
+    encounter_eta (at most max_refinement substeps per step; None switches
+    this off).
+
+    With collisions="merge" or "bounce", bodies whose class sets COLLIDES
+    are checked for contact with every other body every ENCOUNTER_CHECK
+    steps, using their radius and straight-line motion since the last check.
+    A merge conserves mass and momentum; the colliding body is absorbed
+    (the lighter one if both collide) and listed in `absorbed` until
+    take_absorbed() is called. A bounce exchanges momentum along the line of
+    centers with the given restitution.
+
+    With an escape policy (see escape.EscapePolicy), bodies whose class sets
+    ESCAPES are checked at the same interval and removed once they have left
+    the system; they are listed in `escaped` until take_escaped() is called.
+    """
+
+    def __init__(self, capacity=16, force_solver="direct", theta=0.5, integrator="euler",
+                 timestepping="fixed", propagation="numerical", encounter_eta=0.01, max_refinement=1024,
+                 collisions=None, restitution=1.0, escape=None):
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.mass = np.zeros(capacity)
+        self.is_source = np.zeros(capacity, dtype=bool)
+        self.softening = np.zeros(capacity)
+        self.on_conic = np.zeros(capacity, dtype=bool)
+        self.conic_parent = np.full(capacity, -1)  # Reference body row of patched-conic probes
+        self.radius = np.zeros(capacity)
+        self.collides = np.zeros(capacity, dtype=bool)
+        self.escapes = np.zeros(capacity, dtype=bool)
+        self.step_counts = np.zeros(capacity, dtype=np.int64)  # Steps taken per body
+        self.bodies = []
+        self.count = 0
+        self.force_solver = force_solver
+        self.theta = theta
+        self.integrator = integrator
+        self.timestepping = timestepping
+        self.block_stepper = BlockTimestepper()
+        self.propagation = propagation
+        self.kepler = None  # KeplerOrbits while closed-form propagation is active
+        self.encounter_eta = encounter_eta
+        self.max_refinement = max_refinement
+        self.refinement = 1  # Substeps per step used for the last close-encounter check
+        self.conic_switches = 0  # Reference body changes of patched-conic probes
+        self.collisions = collisions
+        self.restitution = restitution
+        self.collision_count = 0
+        self.absorbed = []  # Bodies removed by merges, for the owner of their scene items
+        self.escape = escape
+        self.escaped = []  # Bodies removed by the escape policy, for the owner of their scene items
+        self.time = 0.0  # Simulated seconds
+
+        # Throughput bookkeeping
+        self.steps_taken = 0
+        self.step_time = 0.0
+
+    def _grow(self, capacity):
+        for name in ("pos", "vel", "mass", "is_source", "softening", "on_conic", "conic_parent", "radius",
+                     "collides", "escapes", "step_counts"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def add_body(self, body, source=False, conic=False):
+        """Copy the body's state into the arrays and turn it into a view."""
+        if self.count == len(self.mass):
+            self._grow(2 * len(self.mass))
+        i = self.count
+        self.pos[i] = body.sim_pos
+        self.vel[i] = body.velocity
+        self.mass[i] = body.mass
+        self.is_source[i] = source and not conic
+        self.softening[i] = body.SOFTENING
+        self.on_conic[i] = conic
+        self.conic_parent[i] = -1
+        self.radius[i] = body.radius
+        self.collides[i] = body.COLLIDES
+        self.escapes[i] = body.ESCAPES
+        self.step_counts[i] = 0
+        self.count += 1
+        self.bodies.append(body)
+        body.engine = self
+        body.engine_index = i
+        self.kepler = None
+        return i
+
+    def remove_body(self, body):
+        """Detach the body, keeping its last state, and compact the arrays."""
+        i = body.engine_index
+        pos, vel = self.pos[i].copy(), self.vel[i].copy()
+        n = self.count
+        for arr in (self.pos, self.vel, self.mass, self.is_source, self.softening, self.on_conic,
+                    self.conic_parent, self.radius, self.collides, self.escapes,
+                    self.step_counts):
+            arr[i:n - 1] = arr[i + 1:n]
+        self.count -= 1
+        parents = self.conic_parent[:self.count]
+        parents[parents == i] = -1
+        parents[parents > i] -= 1
+        self.kepler = None
+        del self.bodies[i]
+        for j in range(i, self.count):
+            self.bodies[j].engine_index = j
+        body.engine = None
+        body.engine_index = -1
+        body.sim_pos = pos
+        body.velocity = vel
+
+    def clear(self):
+        for body in list(self.bodies):
+            self.remove_body(body)
+
+    def accelerations(self, pos=None, targets=None):
+        """Accelerations (m/s^2) of the target rows (default: all), shape (len(targets), 2)."""
+        n = self.count
+        if pos is None:
+            pos = self.pos[:n]
+        eps2 = self.softening[:n] ** 2
+        target_pos = pos if targets is None else pos[targets]
+        target_eps2 = eps2 if targets is None else eps2[targets]
+        sources = np.flatnonzero(self.is_source[:n])
+        if len(sources) == 0:
+            return np.zeros((len(target_pos), 2))
+        if self.force_solver == "barnes-hut":
+            # The tree is rebuilt once per evaluation, i.e. once per step
+            tree = QuadTree(pos[sources], self.mass[sources], eps2=eps2[sources])
+            return tree.accelerations(target_pos, self.theta, target_eps2)
+        return kernels.direct_accelerations(target_pos, pos[sources], self.mass[sources], target_eps2, eps2[sources])
+
+    def jerks(self, pos, vel):
+        """Time derivative of the accelerations of all bodies (direct sum)."""
+        sources = np.flatnonzero(self.is_source[:self.count])
+        eps2 = self.softening[:self.count] ** 2
+        dr = pos[sources][None, :, :] - pos[:, None, :]
+        dv = vel[sources][None, :, :] - vel[:, None, :]
+        r2 = np.einsum("ijk,ijk->ij", dr, dr)
+        coincident = r2 == 0
+        r2 = r2 + np.add.outer(eps2, eps2[sources]) / 2
+        r2[coincident] = np.inf
+        rv = np.einsum("ijk,ijk->ij", dr, dv)
+        weight = G * self.mass[sources] / (r2 * np.sqrt(r2))
+        return (np.einsum("ij,ijk->ik", weight, dv)
+                - np.einsum("ij,ijk->ik", 3 * weight * rv / r2, dr))
+
+    def step(self, dt, steps=1):
+        """Advance all bodies by `steps` integrator steps of dt seconds."""
+        start = time.perf_counter()
+        done = 0
+        while done < steps:
+            n = self.count
+            conics = self.on_conic[:n].any()
+            colliding = self.collisions is not None and self.collides[:n].any()
+            culling = self.escape is not None and self.escapes[:n].any()
+            if not conics and not colliding and not culling:
+                self._advance(dt, steps - done)
+                self.time += dt * (steps - done)
+                break
+            batch = min(steps - done, ENCOUNTER_CHECK)
+            if conics:
+                # Patched-conic probes pick their reference body at the start of every batch
+                rows, parents = self._conic_parents()
+                rel_pos = self.pos[rows] - self.pos[parents]
+                rel_vel = self.vel[rows] - self.vel[parents]
+            start_pos = self.pos[:n].copy() if colliding else None
+            self._advance(dt, batch)
+            if conics:
+                kernels.kepler_drift(rel_pos, rel_vel, G * self.mass[parents], dt * batch)
+                self.pos[rows] = self.pos[parents] + rel_pos
+                self.vel[rows] = self.vel[parents] + rel_vel
+            self.time += dt * batch
+            if colliding:
+                self._collide(start_pos)
+            if culling:
+                self._cull()
+            done += batch
+        self.step_time += time.perf_counter() - start
+        self.steps_taken += steps
+
+    def _advance(self, dt, steps):
+        n = self.count
+        if self.propagation != "kepler" or not self._kepler_step(dt * steps):
+            # Cached orbital elements are stale once the state is integrated numerically
+            self.kepler = None
+            if self.timestepping == "block":
+                self.step_counts[:n] += self.block_stepper.advance(
+                    self.pos[:n], self.vel[:n], dt * steps, self.accelerations, self.jerks)
+            else:
+                done = 0
+                while done < steps:
+                    # Encounters develop within long runs, so the split is re-checked as bodies approach
+                    self.refinement, batch = self.encounter_refinement(dt)
+                    batch = min(batch, steps - done)
+                    self._integrate(dt / self.refinement, batch * self.refinement)
+                    done += batch
+
+    def _collide(self, start_pos):
+        """Resolve the contacts of colliding bodies during the move from start_pos to pos."""
+        n = self.count
+        rows = np.flatnonzero(self.radius[:n] > 0)
+        if len(rows) < 2:
+            return
+        i, j, t = collisions.find_collisions(start_pos[rows], self.pos[rows], self.radius[rows])
+        i, j = rows[i], rows[j]
+        keep = self.collides[i] | self.collides[j]
+        i, j, t = i[keep], j[keep], t[keep]
+        if len(i) == 0:
+            return
+        self.kepler = None
+        if self.collisions == "bounce":
+            for a, b, fraction in zip(i, j, t):
+                # Back to where the pair touched, then exchange momentum
+                for row in (a, b):
+                    self.pos[row] = start_pos[row] + fraction * (self.pos[row] - start_pos[row])
+                self.collision_count += collisions.bounce(self.pos, self.vel, self.mass, a, b, self.restitution)
+            return
+
+        absorbed = set()
+        for a, b in zip(i, j):
+            if a in absorbed or b in absorbed:
+                continue  # Already merged this check; a later check sees the merged body
+            if not self.collides[a] or (self.collides[b] and self.mass[b] < self.mass[a]):
+                a, b = b, a
+            # b survives and takes over a's mass and momentum
+            total = self.mass[a] + self.mass[b]
+            self.pos[b] = (self.mass[a] * self.pos[a] + self.mass[b] * self.pos[b]) / total
+            self.vel[b] = (self.mass[a] * self.vel[a] + self.mass[b] * self.vel[b]) / total
+            self.mass[b] = total
+            self.bodies[b].mass = total
+            absorbed.add(a)
+            self.collision_count += 1
+        for body in [self.bodies[row] for row in sorted(absorbed)]:
+            self.remove_body(body)
+            self.absorbed.append(body)
+
+    def _cull(self):
+        """Remove the bodies the escape policy considers gone."""
+        n = self.count
+        rows = np.flatnonzero(self.escapes[:n])
+        sources = np.flatnonzero(self.is_source[:n] & ~self.escapes[:n])
+        if len(rows) == 0 or len(sources) == 0:
+            return
+        center = sources[np.argmax(self.mass[sources])]
+        gm = G * self.mass[center]
+        gone = rows[self.escape.escaped(self.pos[rows], self.vel[rows], self.pos[center], self.vel[center], gm)]
+        if len(gone) == 0:
+            return
+        self.escape.record(self.time, [self.bodies[row].name for row in gone], self.pos[gone], self.vel[gone],
+                           self.pos[center], self.vel[center], gm)
+        for body in [self.bodies[row] for row in gone]:
+            self.remove_body(body)
+            self.escaped.append(body)
+
+    def take_escaped(self):
+        """Bodies removed by the escape policy since the last call."""
+        bodies, self.escaped = self.escaped, []
+        return bodies
+
+    def take_absorbed(self):
+        """Bodies removed by merges since the last call."""
+        bodies, self.absorbed = self.absorbed, []
+        return bodies
+
+    def _conic_parents(self):
+        """Rows of the patched-conic probes and of their reference bodies."""
+        n = self.count
+        rows = np.flatnonzero(self.on_conic[:n])
+        bodies = np.flatnonzero(~self.on_conic[:n])
+        if len(bodies) == 0:
+            return rows[:0], rows[:0]  # Nothing to orbit; the integrator moves probes in straight lines
+        center = np.argmax(self.mass[bodies])
+        soi = spheres_of_influence(self.pos[bodies], self.mass[bodies], center)
+        parents = bodies[reference_bodies(self.pos[rows], self.pos[bodies], soi, center)]
+        previous = self.conic_parent[rows]
+        self.conic_switches += int(np.count_nonzero((previous >= 0) & (previous != parents)))
+        self.conic_parent[rows] = parents
+        return rows, parents
+
+    def _integrate(self, dt, steps):
+        n = self.count
+        if self.integrator == "wisdom-holman":
+            self._wisdom_holman(dt, steps)
+        elif self.force_solver == "direct":
+            # One call for the whole loop, compiled when Numba is available
+            kernels.integrate_sources(self.integrator, self.pos[:n], self.vel[:n], self.mass[:n],
+                                      self.softening[:n] ** 2, np.flatnonzero(self.is_source[:n]), dt, steps)
+        else:
+            INTEGRATORS[self.integrator](self.pos[:n], self.vel[:n], dt, steps, self.accelerations)
+        self.step_counts[:n] += steps
+
+    def _central_source(self):
+        sources = np.flatnonzero(self.is_source[:self.count])
+        return sources[np.argmax(self.mass[sources])]
+
+    def _wisdom_holman(self, dt, steps):
+        n = self.count
+        if not self.is_source[:n].any():
+            self.pos[:n] += self.vel[:n] * (dt * steps)  # Nothing attracts, everything drifts
+            return
+        # Bodies that are not sources pull on nothing, so they enter as massless test particles
+        mass = np.where(self.is_source[:n], self.mass[:n], 0.0)
+        kernels.integrate_wisdom_holman(self.pos[:n], self.vel[:n], mass, self.softening[:n] ** 2,
+                                        self._central_source(), dt, steps)
+
+    def encounter_refinement(self, dt):
+        """(substeps, steps) for close encounters: the power-of-two split of dt that resolves the
+        closest pair, and how many steps of dt may be taken before the next check.
+
+        Orbits around the central body are left to the step the caller chose. Pairs with
+        another attracting body (a custom object) count once they can come within
+        ENCOUNTER_HILL_RADII mutual Hill radii during the step. A custom object's own orbit
+        around the central body counts once the step exceeds ENCOUNTER_PERICENTRE of the
+        free-fall time at its pericentre, i.e. when it plunges toward the central body.
+        Under wisdom-holman only the part of the central pull that the Kepler drift leaves out counts.
+        """
+        n = self.count
+        sources = np.flatnonzero(self.is_source[:n])
+        if self.encounter_eta is None or len(sources) < 2:
+            return 1, ENCOUNTER_CHECK
+        center = self._central_source()
+        others = sources[sources != center]
+        # Patched-conic probes do not need small steps
+        rows = np.flatnonzero(~self.on_conic[:n] & (np.arange(n) != center))
+        diff = self.pos[others][None, :, :] - self.pos[rows, None, :]
+        dv = self.vel[others][None, :, :] - self.vel[rows, None, :]
+        r = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+        v = np.sqrt(np.einsum("ijk,ijk->ij", dv, dv))
+        pair_mass = self.mass[rows, None] + self.mass[others][None, :]
+        distance = np.sqrt(np.einsum("ij,ij->i", self.pos[:n] - self.pos[center], self.pos[:n] - self.pos[center]))
+        hill = ENCOUNTER_HILL_RADII * np.cbrt(pair_mass / (3 * self.mass[center])) * (
+            distance[rows, None] + distance[others][None, :]) / 2
+        pairs = r > 0
+        reach = np.maximum(r - v * dt, 0)
+        close = pairs & (reach < hill)
+        # Pericentre of each custom object's two-body orbit around the central body
+        divers = rows[self.is_source[rows]]
+        rel_pos = self.pos[divers] - self.pos[center]
+        rel_vel = self.vel[divers] - self.vel[center]
+        gm = G * (self.mass[divers] + self.mass[center])
+        dive_r = np.sqrt(np.einsum("ij,ij->i", rel_pos, rel_pos))
+        dive_v = np.sqrt(np.einsum("ij,ij->i", rel_vel, rel_vel))
+        h = np.abs(rel_pos[:, 0] * rel_vel[:, 1] - rel_pos[:, 1] * rel_vel[:, 0])
+        ecc = np.sqrt(np.maximum(1 + (dive_v ** 2 - 2 * gm / dive_r) * h ** 2 / gm ** 2, 0))
+        pericentre = h ** 2 / (gm * (1 + ecc))
+        dive_eps2 = (self.softening[divers] ** 2 + self.softening[center] ** 2) / 2
+        if self.integrator == "wisdom-holman":
+            # The Kepler drift follows the central body's point-mass pull, so only the kicks for its recoil
+            # and for the softening have to be resolved
+            gm = G * (self.mass[divers] + self.mass[center] * (
+                1 - (pericentre ** 2 / (pericentre ** 2 + dive_eps2)) ** 1.5))
+        plunging = dt > ENCOUNTER_PERICENTRE * np.sqrt((pericentre ** 2 + dive_eps2) ** 1.5 / gm)
+        # Checked again before a pair can get within range, or, in an encounter, cross over
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = min(np.min(np.where(close, r, r - hill) / v, where=pairs & (v > 0), initial=np.inf),
+                           np.min(dive_r / dive_v, where=plunging & (dive_v > 0), initial=np.inf))
+        steps = int(np.clip(crossing / (4 * dt), 1, ENCOUNTER_CHECK))
+        if not close.any() and not plunging.any():
+            return 1, steps
+        # The step has to resolve the free-fall time at the closest (softened) distance the pair
+        # can reach within it
+        pair_eps2 = np.add.outer(self.softening[rows] ** 2, self.softening[others] ** 2) / 2
+        dive_reach = np.maximum(dive_r - dive_v * dt, pericentre)
+        free_fall = np.sqrt(min(
+            np.min((reach[close] ** 2 + pair_eps2[close]) ** 1.5 / (G * pair_mass[close]), initial=np.inf),
+            np.min((dive_reach[plunging] ** 2 + dive_eps2[plunging]) ** 1.5 / gm[plunging], initial=np.inf)))
+        ratio = dt / (self.encounter_eta * free_fall)
+        if ratio <= 1:
+            return 1, steps
+        return int(min(2 ** np.ceil(np.log2(ratio)), self.max_refinement)), steps
+
+    def _kepler_step(self, interval):
+        """Move every body along its conic around the only source; False if that is not possible."""
+        n = self.count
+        sources = np.flatnonzero(self.is_source[:n])
+        if len(sources) != 1:
+            return False
+        center = sources[0]
+        others = np.flatnonzero((np.arange(n) != center) & ~self.on_conic[:n])
+        if self.kepler is None:
+            # Elements are derived once from the current state and reused afterwards
+            rel_pos = self.pos[others] - self.pos[center]
+            rel_vel = self.vel[others] - self.vel[center]
+            self.kepler = KeplerOrbits(rel_pos, rel_vel, G * self.mass[center], self.time)
+            self._kepler_center = (self.pos[center].copy(), self.vel[center].copy())
+            if not self.kepler.bound:
+                return False
+
+        # The central body feels no force and keeps drifting with its velocity
+        t = self.time + interval
+        center_pos, center_vel = self._kepler_center
+        self.pos[center] = center_pos + center_vel * (t - self.kepler.epoch)
+        rel_pos, rel_vel = self.kepler.states(t)
+        self.pos[others] = self.pos[center] + rel_pos
+        self.vel[others] = center_vel + rel_vel
+        return True
+
+    def body_step_counts(self):
+        """(name, steps taken) per body, to see where the compute goes."""
+        return [(body.name, int(self.step_counts[i])) for i, body in enumerate(self.bodies)]
+
+    @property
+    def steps_per_second(self):
+        if self.step_time == 0:
+            return 0.0
+        return self.steps_taken / self.step_time
+
+
+def advance_system(engine, moon_system, interval):
+    """Advance planets, custom objects and moons by interval simulated seconds."""
+    planet_substeps, moon_substeps = SUBSTEPS[engine.integrator]
+    engine.step(interval / planet_substeps, planet_substeps)
+    moon_system.step(interval / moon_substeps, moon_substeps)
+
+
+class _PointMass(EngineBody):
+    def __init__(self, mass, pos, velocity):
+        self.mass = mass
+        self.sim_pos = pos
+        self.velocity = velocity
+
+
+def benchmark(body_counts=(10, 50, 100, 200, 500, 1000), steps=100):
+    """Measure engine steps/sec for a sun plus a growing number of custom bodies."""
+    rng = np.random.default_rng(0)
+    results = []
+    for count in body_counts:
+        engine = NBodyEngine()
+        engine.add_body(_PointMass(1.989e30, [0.0, 0.0], [0.0, 0.0]), source=True)
+        for _ in range(count - 1):
+            pos = rng.uniform(-30, 30, 2) * 1.496e11
+            engine.add_body(_PointMass(1e24, pos, rng.normal(0, 3e4, 2)), source=True)
+        engine.step(3600.0, steps)
+        results.append((count, engine.steps_per_second))
+    return results
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or (10, 50, 100, 200, 500, 1000)
+    for count, rate in benchmark(counts):
+        print(f"{count:6d} bodies: {rate:10.1f} steps/s")
@@ -0,0 +1,112 @@
+import threading
+import time
+import numpy as np
+from physics_engine import advance_system
+from frame_clock import FixedTimestepClock
+
+
+class StateSnapshot:
+    """Read-only copy of the simulation state published by the PhysicsWorker."""
+
+    def __init__(self):
+        self.sequence = -1
+        self.time = 0.0
+        self.bodies = ()
+        self.pos = np.zeros((0, 2))
+        self.vel = np.zeros((0, 2))
+        self.moons = ()
+        self.moon_rel_pos = np.zeros((0, 2))
+        self.moon_rel_vel = np.zeros((0, 2))
+
+    def fill(self, sequence, engine, moon_system):
+        n = engine.count
+        for name, source in (("pos", engine.pos[:n]), ("vel", engine.vel[:n]), ("moon_rel_pos", moon_system.rel_pos),
+                             ("moon_rel_vel", moon_system.rel_vel)):
+            target = getattr(self, name)
+            if target.shape != source.shape:
+                target = np.zeros(source.shape)
+                setattr(self, name, target)
+            target.setflags(write=True)
+            target[:] = source
+            target.setflags(write=False)
+        self.bodies = tuple(engine.bodies)
+        self.moons = tuple(moon_system.moons)
+        self.time = engine.time
+        self.sequence = sequence
+
+
+class PhysicsWorker(threading.Thread):
+    """Steps the engine and the moons on a background thread.
+
+    The worker advances sim_rate simulated seconds per wall-clock second in
+    fixed ticks of `tick` seconds, paced by a FixedTimestepClock that catches
+    up at most max_steps ticks at once, and publishes the state into one of two snapshot
+    buffers. The render side only reads the latest snapshot via latest().
+    A buffer the renderer still holds is never overwritten; the worker then
+    skips publishing until the renderer has moved on. Code on other threads
+    that adds or removes bodies must hold `lock`.
+    """
+
+    def __init__(self, engine, moon_system, tick=1 / 120, max_steps=8):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.moon_system = moon_system
+        self.clock = FixedTimestepClock(tick, max_steps)
+        self.sim_rate = 0.0  # Simulated seconds per wall-clock second
+        self.lock = threading.Lock()  # Held while stepping
+
+        self._buffers = [StateSnapshot(), StateSnapshot()]
+        self._front = None  # Index of the latest published buffer
+        self._reading = None  # Index of the buffer the renderer holds
+        self._swap_lock = threading.Lock()
+        self._running = threading.Event()
+        self._running.set()
+        self._sequence = 0
+
+        # Physics throughput, measured independently of the render FPS
+        self.steps_per_second = 0.0
+        self._rate_steps = 0
+        self._rate_start = time.perf_counter()
+
+    def run(self):
+        self.clock.reset()
+        while self._running.is_set():
+            steps = self.clock.tick()
+            if steps:
+                with self.lock:
+                    for _ in range(steps):
+                        advance_system(self.engine, self.moon_system, self.sim_rate * self.clock.step)
+                    self._publish()
+                self._count_steps(steps)
+            time.sleep(self.clock.time_to_next_step())
+
+    def stop(self):
+        self._running.clear()
+        if self.is_alive():
+            self.join()
+
+    def _publish(self):
+        with self._swap_lock:
+            back = 0 if self._front != 0 else 1
+            if back == self._reading:
+                return
+        self._sequence += 1
+        self._buffers[back].fill(self._sequence, self.engine, self.moon_system)
+        with self._swap_lock:
+            self._front = back
+
+    def latest(self):
+        """The most recently published snapshot, or None before the first one."""
+        with self._swap_lock:
+            if self._front is None:
+                return None
+            self._reading = self._front
+            return self._buffers[self._front]
+
+    def _count_steps(self, steps):
+        self._rate_steps += steps
+        elapsed = time.perf_counter() - self._rate_start
+        if elapsed >= 1.0:
+            self.steps_per_second = self._rate_steps / elapsed
+            self._rate_steps = 0
+            self._rate_start = time.perf_counter()
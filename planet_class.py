@@ -4,8 +4,10 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtSvg import *
 import math
 import numpy as np
+from physics_engine import EngineBody
+from solar_system_model import PLANET_SOFTENING, scene_radius
 
-class PlanetObject(QGraphicsObject):
+class PlanetObject(EngineBody, QGraphicsObject):
     # Simulation constants
     G = 6.67428e-11
     TIMESTEP = 3600 * 24  # 24 hours per physics update (in simulation units)
@@ -14,6 +16,7 @@ class PlanetObject(QGraphicsObject):
     HIGHSCALE = 1000
     METER_PER_PIXEL = AU / SCALE
     METER_PER_PIXEL_HIGHSCALE = AU / HIGHSCALE
+    SOFTENING = PLANET_SOFTENING  # Plummer softening length [m]
 
     def __init__(self, name, mass, scene, x, y, size, scaletype, texture_path, solar_system):
         super().__init__()
@@ -23,6 +26,7 @@ class PlanetObject(QGraphicsObject):
         self.solar_system = solar_system
         self.sim_pos = np.array([x * self.AU, y * self.AU])
         self.scaletype = scaletype
+        self.radius = scene_radius(size, scaletype)  # Collision radius [m]
         self.hover_state = False
         self.distance = math.hypot(0, 0)
         self.is_followed = False
@@ -93,7 +97,6 @@ class PlanetObject(QGraphicsObject):
                         self.sim_pos[1] / self.METER_PER_PIXEL_HIGHSCALE)
 
         self.velocity = np.array([0.0, 0.0])
-        self.acceleration = np.array([0.0, 0.0])
         scene.addItem(self)
         self.scene = scene
         self.setZValue(1)
@@ -149,40 +152,18 @@ class PlanetObject(QGraphicsObject):
         if self.name != "sun":
             self.text_item.setVisible(focused)
 
-    def attraction(self, other):
-        if self == other:
-            return np.array([0.0, 0.0])
-        own_pos = self.sim_pos
-        other_pos = other.sim_pos
-        distance_vector = other_pos - own_pos
-        # Calculate the distance vector and its magnitude
-        # Use np.linalg.norm for better readability and efficiency
-        # Also, avoid using math.hypot as it is not necessary here
-        distance = np.linalg.norm(distance_vector)
-        if distance == 0:
-            return np.array([0.0, 0.0])
-        force = PlanetObject.G * self.mass * other.mass / (distance ** 2)
-        return (force / distance) * distance_vector
-
-    def update_position(self, planets, custom_objects, simulation_speed):
-        net_force = np.array([0.0, 0.0])
-        for planet in planets:
-            if self != planet and planet.name == "sun":
-                net_force += self.attraction(planet)
-        for custom_object in custom_objects:
-            net_force += self.attraction(custom_object)
-        self.acceleration = net_force / self.mass
-        self.velocity += self.acceleration * self.TIMESTEP * simulation_speed
-        self.sim_pos += self.velocity * self.TIMESTEP * simulation_speed
-
+    def sync_position(self, sim_pos=None):
+        # Physics is stepped by the NBodyEngine; this only mirrors the state (or a snapshot of it) into the scene
+        if sim_pos is None:
+            sim_pos = self.sim_pos
         if self.scaletype == "SCALE":
-            new_pos = QPointF(self.sim_pos[0] / self.METER_PER_PIXEL,
-                              self.sim_pos[1] / self.METER_PER_PIXEL)
+            new_pos = QPointF(sim_pos[0] / self.METER_PER_PIXEL,
+                              sim_pos[1] / self.METER_PER_PIXEL)
         else:
-            new_pos = QPointF(self.sim_pos[0] / self.METER_PER_PIXEL_HIGHSCALE,
-                              self.sim_pos[1] / self.METER_PER_PIXEL_HIGHSCALE)
+            new_pos = QPointF(sim_pos[0] / self.METER_PER_PIXEL_HIGHSCALE,
+                              sim_pos[1] / self.METER_PER_PIXEL_HIGHSCALE)
 
-            # Update both the planet and its text position
+        # Update both the planet and its text position
         self.updatePosition(new_pos)
         self.update()  # Request a redraw
 
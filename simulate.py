@@ -0,0 +1,115 @@
+"""Run the solar system without a display.
+
+Example:
+    python simulate.py --years 100 --integrator yoshida4 --output final_state.npz
+    python simulate.py --years 10 --custom probe,1e25,1.5,0,0,25000
+    python simulate.py --years 1000 --integrator wisdom-holman --step 648000
+    python simulate.py --years 10 --step 86400 --conic --custom probe,1000,1.0,0.01,0,30800
+    python simulate.py --years 100 --step 86400 --record century.traj --record-cadence 24
+"""
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from integrators import INTEGRATOR_NAMES
+from escape import EscapePolicy, ESCAPE_MODES
+from solar_system_model import SolarSystemModel, AU, SECONDS_PER_YEAR
+from trajectory import TrajectoryRecorder
+
+
+def parse_custom(text):
+    # name,mass[kg],x[AU],y[AU],vx[m/s],vy[m/s][,size[px]]
+    name, *values = text.split(",")
+    if len(values) not in (5, 6):
+        raise argparse.ArgumentTypeError("expected name,mass,x,y,vx,vy[,size]")
+    mass, x, y, vx, vy, size = (float(value) for value in values + ["0"] * (6 - len(values)))
+    return name, mass, [x * AU, y * AU], [vx, vy], size
+
+
+def write_state(path, model):
+    names, pos, vel = model.state()
+    if path.endswith(".npz"):
+        np.savez(path, names=np.array(names), pos=pos, vel=vel, time=model.engine.time)
+    else:
+        with open(path, "w") as file:
+            json.dump({"time": model.engine.time,
+                       "bodies": [{"name": name, "pos": p.tolist(), "vel": v.tolist()}
+                                  for name, p, v in zip(names, pos, vel)]}, file, indent=2)
+
+
+def record_state(recorder, model):
+    engine, moon_system = model.engine, model.moon_system
+    n = engine.count
+    recorder.record(engine.time, engine.bodies, engine.pos[:n], engine.vel[:n], moon_system.moons,
+                    moon_system.rel_pos, moon_system.rel_vel, model.custom_objects)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless solar system simulation")
+    parser.add_argument("--years", type=float, default=1.0, help="simulated years to run")
+    parser.add_argument("--step", type=float, default=3600.0, help="physics step in simulated seconds")
+    parser.add_argument("--integrator", choices=INTEGRATOR_NAMES, default="euler")
+    parser.add_argument("--timestepping", choices=["fixed", "block"], default="fixed")
+    parser.add_argument("--propagation", choices=["numerical", "kepler"], default="numerical")
+    parser.add_argument("--force-solver", choices=["direct", "barnes-hut"], default="direct")
+    parser.add_argument("--theta", type=float, default=0.5, help="Barnes-Hut opening angle")
+    parser.add_argument("--no-moons", action="store_true")
+    parser.add_argument("--custom", type=parse_custom, action="append", default=[],
+                        metavar="NAME,MASS,X,Y,VX,VY[,SIZE]",
+                        help="add a custom object (kg, AU, m/s, radius in pixels for collisions)")
+    parser.add_argument("--conic", action="store_true",
+                        help="custom objects are patched-conic probes that attract nothing")
+    parser.add_argument("--collisions", choices=["merge", "bounce"], default=None,
+                        help="detect collisions of custom objects with a size")
+    parser.add_argument("--escape", choices=ESCAPE_MODES, default=None,
+                        help="retire custom objects that left the system")
+    parser.add_argument("--escape-distance", type=float, default=None, help="escape limit in AU")
+    parser.add_argument("--escape-log", default=None, help="CSV file that records escaped objects")
+    parser.add_argument("--record", default=None, help="trajectory file that records the whole run")
+    parser.add_argument("--record-cadence", type=float, default=24.0, help="simulated hours between records")
+    parser.add_argument("--output", default="final_state.json", help=".json or .npz")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    escape = None
+    if args.escape is not None:
+        escape = EscapePolicy(args.escape, None if args.escape_distance is None else args.escape_distance * AU,
+                              args.escape_log)
+    model = SolarSystemModel.default(moons=not args.no_moons, integrator=args.integrator,
+                                     timestepping=args.timestepping, propagation=args.propagation,
+                                     force_solver=args.force_solver, theta=args.theta, collisions=args.collisions,
+                                     escape=escape)
+    for name, mass, pos, vel, size in args.custom:
+        model.add_custom_object(name, mass, pos, vel, conic=args.conic, size=size)
+
+    progress = None
+    chunk = 1000
+    if args.record is not None:
+        recorder = TrajectoryRecorder(args.record, args.record_cadence * 3600)
+        record_state(recorder, model)
+        # One record per chunk of steps
+        chunk = max(int(round(recorder.cadence / args.step)), 1)
+
+        def progress(done, total):
+            record_state(recorder, model)
+
+    start = time.perf_counter()
+    model.advance(args.years * SECONDS_PER_YEAR, args.step, progress=progress, chunk=chunk)
+    elapsed = time.perf_counter() - start
+    if args.record is not None:
+        recorder.close()
+        print(f"{recorder.count} records written to {args.record}")
+
+    write_state(args.output, model)
+    steps = model.engine.steps_taken
+    print(f"{args.years:g} years, {steps} steps, {model.engine.count + len(model.moons)} bodies in {elapsed:.2f} s")
+    print(f"{steps / elapsed:.0f} steps/s, {args.years / elapsed:.2f} simulated years/s")
+    print(f"final state written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+import traceback
+import numpy as np
+
+# Binary session snapshots: a header, one record per engine row and one per
+# moon, written with numpy in a fixed little-endian layout. Taking a snapshot
+# only copies a few small arrays, so the frame loop can do it under the physics
+# lock; writing the file is left to the Autosaver thread.
+
+MAGIC = b"SSSNAP01"
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("bodies", "<i4"), ("moons", "<i4"), ("time", "<f8"),
+                         ("simulation_days", "<f8"), ("years_passed", "<i4")])
+# Every per-row array of the NBodyEngine, plus what is needed to recreate custom objects
+BODY_DTYPE = np.dtype([("name", "S32"), ("custom", "?"), ("size", "<f8"), ("pos", "<f8", 2), ("vel", "<f8", 2),
+                       ("mass", "<f8"), ("is_source", "?"), ("softening", "<f8"), ("on_conic", "?"),
+                       ("conic_parent", "<i4"), ("radius", "<f8"), ("collides", "?"), ("escapes", "?"),
+                       ("step_counts", "<i8")])
+MOON_DTYPE = np.dtype([("name", "S32"), ("rel_pos", "<f8", 2), ("rel_vel", "<f8", 2), ("step_counts", "<i8")])
+ENGINE_FIELDS = ("pos", "vel", "mass", "is_source", "softening", "on_conic", "conic_parent", "radius", "collides",
+                 "escapes", "step_counts")
+
+
+def encode_name(name, size=32):
+    """UTF-8 bytes of name, cut to at most `size` bytes without splitting a character."""
+    return name.encode()[:size].decode("utf-8", "ignore").encode()
+
+
+class Snapshot:
+    """Copy of the engine and moon state of a session."""
+
+    def __init__(self, header, bodies, moons):
+        self.header = header
+        self.bodies = bodies
+        self.moons = moons
+
+    @property
+    def time(self):
+        return float(self.header["time"])
+
+    @classmethod
+    def capture(cls, engine, moon_system, simulation_days=0.0, years_passed=0, custom=()):
+        """Snapshot of engine and moon_system; `custom` holds the bodies recreated as custom objects on restore."""
+        n = engine.count
+        bodies = np.zeros(n, dtype=BODY_DTYPE)
+        bodies["name"] = [encode_name(body.name) for body in engine.bodies]
+        bodies["custom"] = [body in custom for body in engine.bodies]
+        bodies["size"] = [getattr(body, "size", 0) for body in engine.bodies]
+        for name in ENGINE_FIELDS:
+            bodies[name] = getattr(engine, name)[:n]
+        moons = np.zeros(len(moon_system.moons), dtype=MOON_DTYPE)
+        moons["name"] = [encode_name(moon.name) for moon in moon_system.moons]
+        moons["rel_pos"] = moon_system.rel_pos
+        moons["rel_vel"] = moon_system.rel_vel
+        moons["step_counts"] = moon_system.step_counts
+        header = np.array((MAGIC, n, len(moons), engine.time, simulation_days, years_passed), dtype=HEADER_DTYPE)
+        return cls(header, bodies, moons)
+
+    def save(self, path):
+        # Written next to the target and renamed, so a crash never leaves a half-written snapshot
+        partial = path + ".partial"
+        with open(partial, "wb") as file:
+            self.header.tofile(file)
+            self.bodies.tofile(file)
+            self.moons.tofile(file)
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            header = np.fromfile(file, dtype=HEADER_DTYPE, count=1)
+            if len(header) == 0 or header[0]["magic"] != MAGIC:
+                raise ValueError(f"{path} is not a simulation snapshot")
+            header = header[0]
+            bodies = np.fromfile(file, dtype=BODY_DTYPE, count=int(header["bodies"]))
+            moons = np.fromfile(file, dtype=MOON_DTYPE, count=int(header["moons"]))
+        if len(bodies) != header["bodies"] or len(moons) != header["moons"]:
+            raise ValueError(f"{path} is truncated")
+        return cls(header, bodies, moons)
+
+    def restore(self, engine, moon_system):
+        """Overwrite the state of engine and moon_system, whose rows must already hold the same bodies.
+        The moons are left alone when moon_system holds other moons."""
+        n = engine.count
+        if n != len(self.bodies) or [encode_name(body.name) for body in engine.bodies] != list(self.bodies["name"]):
+            raise ValueError("snapshot bodies do not match the engine")
+        for name in ENGINE_FIELDS:
+            getattr(engine, name)[:n] = self.bodies[name]
+        engine.time = self.time
+        engine.kepler = None
+        if [encode_name(moon.name) for moon in moon_system.moons] == list(self.moons["name"]):
+            moon_system.rel_pos[:] = self.moons["rel_pos"]
+            moon_system.rel_vel[:] = self.moons["rel_vel"]
+            moon_system.step_counts[:] = self.moons["step_counts"]
+
+
+class Autosaver(threading.Thread):
+    """Writes snapshots handed over with submit() on a background thread.
+
+    Only the newest pending snapshot is written; one submitted while the
+    previous write is still running replaces any older pending one.
+    """
+
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.path = path
+        self.saves = 0
+        self.last_error = None
+        self.last_duration = 0.0  # Wall-clock seconds of the last write
+        self._pending = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = True
+
+    def submit(self, snapshot):
+        with self._lock:
+            self._pending = snapshot
+        self._wake.set()
+
+    def run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                snapshot, self._pending = self._pending, None
+            if snapshot is not None:
+                start = time.perf_counter()
+                try:
+                    snapshot.save(self.path)
+                    self.saves += 1
+                except OSError as error:
+                    self.last_error = error
+                    print(f"Could not autosave to {self.path}: {error}")
+                except Exception as error:
+                    # Not a file system problem: report it, but keep the thread for the next snapshot
+                    self.last_error = error
+                    traceback.print_exc()
+                self.last_duration = time.perf_counter() - start
+            if not self._running:
+                return
+
+    def stop(self):
+        # The pending snapshot, if any, is still written
+        self._running = False
+        self._wake.set()
+        if self.is_alive():
+            self.join()
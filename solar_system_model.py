@@ -0,0 +1,207 @@
+import math
+import numpy as np
+from physics_engine import NBodyEngine, EngineBody
+from moon_system import MoonSystem, SatelliteBody
+
+# Simulation constants (shared with the scene classes)
+G = 6.67428e-11
+AU = 1.496e11
+SCALE = 2000
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+METER_PER_PIXEL = AU / SCALE
+MASS_UNIT = 10 ** 24  # Custom object masses are entered in units of 10^24 kg
+HIGHSCALE = 1000  # Pixels per AU for the outer planets
+
+# Plummer softening lengths [m] per body class. Custom objects are softened by
+# about a solar radius so heavy ones can pass close to the sun or each other
+# at normal step sizes; planets and moons keep exact point-mass gravity.
+PLANET_SOFTENING = 0.0
+MOON_SOFTENING = 0.0
+CUSTOM_SOFTENING = 1e9
+
+# Default solar system: name, mass [kg], radius [px], texture
+SUN = ("sun", 1.989e30, 400, "sun.svg")
+
+# name, mass [kg], distance from the sun [AU], radius [px], scale type, texture
+PLANETS = [
+    ("mercury", 3.3011e23, 0.39 + SCALE / 10000, 80, "SCALE", "mercury.svg"),
+    ("venus", 4.867e24, 0.72 + SCALE / 10000, 130, "SCALE", "venus.svg"),
+    ("earth", 5.9722e24, 1 + SCALE / 10000, 150, "SCALE", "earth.svg"),
+    ("mars", 6.417e23, 1.52 + SCALE / 10000, 130, "SCALE", "mars.svg"),
+    ("jupiter", 1.898e27, 5.2, 180, "HIGHSCALE", "jupiter.svg"),
+    ("saturn", 5.683e26, 9.54, 370, "HIGHSCALE", "saturn.svg"),  # extra größer weil grafik vergleichsweise kleiner (wegen den ringen)
+    ("uranus", 8.681e25, 19.22, 340, "HIGHSCALE", "uranus.svg"),
+    ("neptune", 1.024e26, 30.1, 150, "HIGHSCALE", "neptune.svg"),
+]
+
+# name, mass [kg], distance from the planet [AU], radius [px], parent planet (index into the sun + PLANETS list)
+MOONS = [
+    ("moon", 7.346e22, 0.0026, 20, 3),
+    ("ganymed", 1.4819e23, 0.0071, 30, 5),
+    ("io", 8.931e22, 0.0028, 25, 5),
+    ("europa", 4.8e22, 0.0045, 18, 5),
+    ("titan", 1.345e23, 0.00817, 28, 6),
+    ("triton", 2.14e22, 0.0024, 18, 8),
+    ("titania", 3.46e21, 0.0018, 20, 7),
+    ("oberon", 3.11e21, 0.0039, 23, 7),
+    ("umbriel", 1.17e21, 0.00178, 15, 7),
+    ("rhea", 2.31e21, 0.0035, 18, 6),
+    ("dione", 1.1e21, 0.0025, 20, 6),
+]
+
+
+def planet_velocity(x, sun_size, sun_mass):
+    # Planets start on the x axis. The speed is that of a circular orbit at the
+    # on-screen distance, which includes the sun's radius.
+    r_meters = (x + sun_size / SCALE) * AU
+    return np.array([0.0, math.sqrt(G * sun_mass / r_meters)])
+
+
+def moon_velocity(rel_pos, planet_mass):
+    # Circular orbit around the planet, perpendicular to the radius
+    r_meters = np.linalg.norm(rel_pos)
+    radial_unit = rel_pos / r_meters
+    return math.sqrt(G * planet_mass / r_meters) * np.array([-radial_unit[1], radial_unit[0]])
+
+
+def scene_radius(size, scaletype="SCALE"):
+    # Collision radius [m] of a body drawn with a radius of `size` pixels
+    return size * AU / (HIGHSCALE if scaletype == "HIGHSCALE" else SCALE)
+
+
+def launch_velocity(x, y, x_dir, y_dir, speed):
+    # Custom objects are launched from (x, y) towards the second click (x_dir, y_dir)
+    direction = np.array([x_dir - x, y_dir - y], dtype=float)
+    dist = np.linalg.norm(direction)
+    if dist == 0:
+        return np.zeros(2)  # overlapping points: no movement
+    return direction / dist * speed
+
+
+class Body(EngineBody):
+    """Planet or sun without a scene item."""
+    SOFTENING = PLANET_SOFTENING
+
+    def __init__(self, name, mass, sim_pos, velocity, radius=0.0):
+        self.name = name
+        self.mass = mass
+        self.sim_pos = sim_pos
+        self.velocity = velocity
+        self.radius = radius
+
+
+class CustomBody(Body):
+    """Custom object without a scene item."""
+    SOFTENING = CUSTOM_SOFTENING
+    COLLIDES = True
+    ESCAPES = True
+
+
+class Satellite(SatelliteBody):
+    """Moon without a scene item."""
+    SOFTENING = MOON_SOFTENING
+
+    def __init__(self, name, mass, planet, rel_pos, rel_velocity):
+        self.name = name
+        self.mass = mass
+        self.planet = planet
+        self.rel_pos = rel_pos
+        self.rel_velocity = rel_velocity
+
+
+class SolarSystemModel:
+    """The simulation core of SolarSystem without any Qt dependency."""
+
+    def __init__(self, engine=None, moon_system=None):
+        self.engine = engine if engine is not None else NBodyEngine()
+        self.moon_system = moon_system if moon_system is not None else MoonSystem(self.engine.integrator,
+                                                                                  self.engine.timestepping)
+        self.planets = []
+        self.moons = []
+        self.custom_objects = []
+
+    @classmethod
+    def default(cls, moons=True, **engine_options):
+        """The system built by SolarSystem.initialize_planets and add_moons."""
+        model = cls(NBodyEngine(**engine_options))
+        name, mass, size, _ = SUN
+        sun = Body(name, mass, [0.0, 0.0], [0.0, 0.0], scene_radius(size))
+        model.planets.append(sun)
+        model.engine.add_body(sun, source=True)
+        for name, mass, x, planet_size, scaletype, _ in PLANETS:
+            planet = Body(name, mass, [x * AU, 0.0], planet_velocity(x, size, sun.mass),
+                          scene_radius(planet_size, scaletype))
+            model.planets.append(planet)
+            model.engine.add_body(planet)
+        if moons:
+            for name, mass, x, _, parent in MOONS:
+                model.add_moon(name, mass, x, model.planets[parent])
+        return model
+
+    def add_moon(self, name, mass, x, planet):
+        rel_pos = np.array([x * AU, 0.0])
+        moon = Satellite(name, mass, planet, rel_pos, moon_velocity(rel_pos, planet.mass))
+        self.moons.append(moon)
+        self.moon_system.add_moon(moon)
+        return moon
+
+    def add_custom_object(self, name, mass, sim_pos, velocity, conic=False, size=0):
+        """Custom object as created in creation mode; it attracts every other body.
+
+        With conic=True it is a patched-conic probe instead: it attracts nothing
+        and follows a two-body orbit around the body whose sphere of influence it is in.
+        size is the radius in pixels, which is what collisions use.
+        """
+        body = CustomBody(name, mass, sim_pos, velocity, scene_radius(size))
+        self.custom_objects.append(body)
+        self.engine.add_body(body, source=not conic, conic=conic)
+        return body
+
+    def advance(self, seconds, step=3600.0, moon_step=None, progress=None, chunk=1000, closed_form=False):
+        """Integrate for the given simulated time in steps of `step` seconds.
+
+        Moons use moon_step (default: a tenth of step, like the frame loop).
+        progress(done_seconds, total_seconds) is called after every chunk of
+        steps and may return False to stop early. With closed_form=True,
+        planets and moons are moved along their conics wherever that is exact.
+        Returns the bodies merged or escaped on the way, which have left the engine.
+        """
+        if moon_step is None:
+            moon_step = step / 10
+        total_steps = int(math.ceil(seconds / step))
+        propagation = self.engine.propagation
+        if closed_form:
+            self.engine.propagation = "kepler"
+        retired = []
+        try:
+            done = 0
+            while done < total_steps:
+                steps = min(chunk, total_steps - done)
+                self.engine.step(step, steps)
+                for body in self.engine.take_absorbed() + self.engine.take_escaped():
+                    # The engine may hold bodies added by someone else, e.g. the window's custom objects
+                    if body in self.custom_objects:
+                        self.custom_objects.remove(body)
+                    retired.append(body)
+                if closed_form:
+                    self.moon_system.propagate_kepler(steps * step)
+                else:
+                    moon_steps = int(round(steps * step / moon_step))
+                    self.moon_system.step(steps * step / moon_steps, moon_steps)
+                done += steps
+                if progress is not None and progress(done * step, total_steps * step) is False:
+                    break
+        finally:
+            self.engine.propagation = propagation
+        return retired
+
+    def state(self):
+        """Names, absolute positions [m] and velocities [m/s] of every body."""
+        names = [body.name for body in self.engine.bodies]
+        pos = self.engine.pos[:self.engine.count].copy()
+        vel = self.engine.vel[:self.engine.count].copy()
+        for moon in self.moon_system.moons:
+            names.append(moon.name)
+            pos = np.vstack((pos, moon.sim_pos))
+            vel = np.vstack((vel, moon.planet.velocity + moon.rel_velocity))
+        return names, pos, vel
@@ -0,0 +1,170 @@
+"""Parameter sweep over custom-object launches on all cores.
+
+Every grid point is a create_object launch (mass, size, position, direction,
+speed) into the default solar system; the size is the collision radius, so
+launches that hit a body end as an impact. Workers integrate their chunk as an
+Ensemble and write the results straight into a shared-memory block. The
+finished chunks are checkpointed, so an interrupted sweep resumes where it
+stopped.
+
+Example:
+    python sweep.py --masses 1,100 --speeds 20000:60000:41 --angles 0:360:36 --years 2 --output sweep.csv
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+import numpy as np
+from multiprocessing import Pool, shared_memory
+from ensemble import Ensemble, OUTCOMES
+from integrators import INTEGRATORS
+from solar_system_model import SolarSystemModel, SECONDS_PER_YEAR
+
+# Result columns per grid point
+FIELDS = ["outcome", "planet", "a", "e", "final_x", "final_y", "final_vx", "final_vy"]
+# Parameter columns per grid point, as accepted by create_object
+PARAMETERS = ["mass", "size", "x", "y", "x_dir", "y_dir", "speed"]
+
+_worker = {}
+
+
+def build_grid(masses, sizes, positions, angles, speeds):
+    rows = []
+    for mass, size, (x, y), angle, speed in itertools.product(masses, sizes, positions, angles, speeds):
+        # The direction is given as a second point, like the second click in creation mode
+        x_dir = x + 100 * np.cos(np.radians(angle))
+        y_dir = y + 100 * np.sin(np.radians(angle))
+        rows.append((mass, size, x, y, x_dir, y_dir, speed))
+    return np.array(rows, dtype=float)
+
+
+def _init_worker(shm_name, shape, seconds, step, integrator):
+    _worker["shm"] = shared_memory.SharedMemory(name=shm_name)
+    _worker["results"] = np.ndarray(shape, dtype=np.float64, buffer=_worker["shm"].buf)
+    _worker["model"] = SolarSystemModel.default(moons=False)
+    _worker["run"] = (seconds, step, integrator)
+
+
+def _run_chunk(task):
+    start, params = task
+    seconds, step, integrator = _worker["run"]
+    launches = params[:, [0, 2, 3, 4, 5, 6]]  # create_object launch without the size
+    ensemble = Ensemble.from_launches(_worker["model"], launches, integrator, sizes=params[:, 1])
+    ensemble.run(seconds, step)
+
+    results = _worker["results"][start:start + len(params)]
+    for row, (kind, planet, a, e) in zip(results, ensemble.outcomes()):
+        row[0] = OUTCOMES.index(kind)
+        row[1] = ensemble.names.index(planet) if planet else -1
+        row[2] = np.nan if a is None else a
+        row[3] = np.nan if e is None else e
+    results[:, 4:6] = ensemble.pos[:, -1]
+    results[:, 6:8] = ensemble.vel[:, -1]
+    return start, len(params)
+
+
+def load_checkpoint(path, grid, seconds, step, integrator):
+    if path is None or not os.path.exists(path):
+        return None, None
+    data = np.load(path)
+    if data["grid"].shape != grid.shape or not np.array_equal(data["grid"], grid):
+        print(f"checkpoint {path} belongs to a different grid, starting over")
+        return None, None
+    if ("run" not in data or not np.array_equal(data["run"], [seconds, step])
+            or str(data["integrator"]) != integrator):
+        print(f"checkpoint {path} belongs to a run with other years, step or integrator, starting over")
+        return None, None
+    return data["results"], data["done"]
+
+
+def save_checkpoint(path, grid, results, done, seconds, step, integrator):
+    # Write next to the old checkpoint and swap, so an interruption never leaves a broken file
+    temporary = path + ".tmp.npz"
+    np.savez(temporary, grid=grid, results=results, done=done, run=[seconds, step],
+             integrator=integrator)
+    os.replace(temporary, path)
+
+
+def run_sweep(grid, seconds, step=6 * 3600.0, integrator="leapfrog", workers=None, chunk=64,
+              checkpoint=None, checkpoint_interval=30.0):
+    """Results array (len(grid), len(FIELDS)) for every grid point."""
+    shape = (len(grid), len(FIELDS))
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    try:
+        results = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        results[:] = np.nan
+        done = np.zeros(len(grid), dtype=bool)
+        saved_results, saved_done = load_checkpoint(checkpoint, grid, seconds, step, integrator)
+        if saved_results is not None:
+            results[:] = saved_results
+            done[:] = saved_done
+            print(f"resuming: {int(done.sum())} of {len(grid)} grid points already done")
+
+        tasks = [(start, grid[start:start + chunk]) for start in range(0, len(grid), chunk)
+                 if not done[start:start + chunk].all()]
+        last_save = time.perf_counter()
+        with Pool(workers, _init_worker, (shm.name, shape, seconds, step, integrator)) as pool:
+            for start, count in pool.imap_unordered(_run_chunk, tasks):
+                done[start:start + count] = True
+                if checkpoint and time.perf_counter() - last_save > checkpoint_interval:
+                    save_checkpoint(checkpoint, grid, results, done, seconds, step, integrator)
+                    last_save = time.perf_counter()
+        if checkpoint:
+            save_checkpoint(checkpoint, grid, results, done, seconds, step, integrator)
+        return results.copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def parse_values(text, endpoint=True):
+    # "a,b,c" or "start:stop:count"
+    if ":" in text:
+        start, stop, count = text.split(":")
+        return list(np.linspace(float(start), float(stop), int(count), endpoint=endpoint))
+    return [float(value) for value in text.split(",")]
+
+
+def parse_angles(text):
+    # A range of directions leaves out the end, 0:360:4 is 0, 90, 180 and 270 degrees
+    return parse_values(text, endpoint=False)
+
+
+def parse_positions(text):
+    # "x,y;x,y" in scene pixels
+    return [tuple(float(value) for value in point.split(",")) for point in text.split(";")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep custom-object launches across all cores")
+    parser.add_argument("--masses", type=parse_values, default=[1.0], help="in 10^24 kg")
+    parser.add_argument("--sizes", type=parse_values, default=[40.0], help="collision radii in pixels")
+    parser.add_argument("--positions", type=parse_positions, default=[(3200.0, 0.0)], help="x,y;x,y in pixels")
+    parser.add_argument("--angles", type=parse_angles, default=[90.0], help="launch directions in degrees")
+    parser.add_argument("--speeds", type=parse_values, default=[30000.0], help="in m/s")
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--step", type=float, default=6 * 3600.0, help="physics step in simulated seconds")
+    parser.add_argument("--integrator", choices=list(INTEGRATORS), default="leapfrog")
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--checkpoint", default="sweep_checkpoint.npz")
+    parser.add_argument("--output", default="sweep.csv")
+    args = parser.parse_args(argv)
+
+    grid = build_grid(args.masses, args.sizes, args.positions, args.angles, args.speeds)
+    start = time.perf_counter()
+    results = run_sweep(grid, args.years * SECONDS_PER_YEAR, args.step, args.integrator, args.workers,
+                        checkpoint=args.checkpoint)
+    elapsed = time.perf_counter() - start
+
+    np.savetxt(args.output, np.hstack((grid, results)), delimiter=",", header=",".join(PARAMETERS + FIELDS),
+               comments="")
+    counts = np.bincount(results[:, 0].astype(int), minlength=len(OUTCOMES))
+    print(f"{len(grid)} launches in {elapsed:.2f} s: "
+          + ", ".join(f"{kind}: {count}" for kind, count in zip(OUTCOMES, counts)))
+    print(f"results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from archive import write_archive, TrajectoryArchive
+from solar_system_model import SolarSystemModel, AU, SECONDS_PER_YEAR
+from trajectory import TrajectoryRecorder, TrajectoryFile
+
+
+def record(model, recorder):
+    engine, moon_system = model.engine, model.moon_system
+    n = engine.count
+    recorder.record(engine.time, engine.bodies, engine.pos[:n], engine.vel[:n], moon_system.moons,
+                    moon_system.rel_pos, moon_system.rel_vel, model.custom_objects)
+
+
+@pytest.fixture(scope="module")
+def trajectory(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("archive") / "run.traj")
+    model = SolarSystemModel.default(integrator="yoshida4")
+    recorder = TrajectoryRecorder(path, cadence=86400.0)
+    record(model, recorder)
+    model.advance(SECONDS_PER_YEAR, 21600.0, progress=lambda done, total: record(model, recorder), chunk=4)
+    # A body that only exists in the later records
+    model.add_custom_object("probe", 1e25, [2 * AU, 0.0], [0.0, 21000.0])
+    model.advance(SECONDS_PER_YEAR, 21600.0, progress=lambda done, total: record(model, recorder), chunk=4)
+    recorder.close()
+    return TrajectoryFile(path)
+
+
+def test_round_trip_stays_within_half_the_precision(trajectory, tmp_path):
+    path = str(tmp_path / "run.arch")
+    write_archive(path, trajectory, position_precision=1000.0, velocity_precision=1e-3, chunk=128, factor=4)
+    archive = TrajectoryArchive(path)
+    assert len(archive.levels) > 1
+    assert archive.names == trajectory.names
+    for level, stride in enumerate(archive.levels["stride"]):
+        times, states = archive.read(archive.start, archive.end, level)
+        expected = np.array(trajectory.states[::stride])
+        assert np.array_equal(times, trajectory.times[::stride])
+        assert np.array_equal(np.isnan(states), np.isnan(expected))
+        error = np.nan_to_num(np.abs(states - expected))
+        assert error[..., :2].max() <= 500.0 * (1 + 1e-9)
+        assert error[..., 2:].max() <= 0.5e-3 * (1 + 1e-9)
+
+
+def test_compresses_the_records(trajectory, tmp_path):
+    path = tmp_path / "run.arch"
+    write_archive(str(path), trajectory)
+    assert path.stat().st_size < trajectory.states.nbytes / 3
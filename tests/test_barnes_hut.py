@@ -0,0 +1,26 @@
+import numpy as np
+from solar_system_model import SolarSystemModel, AU
+
+
+def crowded_engine(**engine_options):
+    model = SolarSystemModel.default(moons=False, **engine_options)
+    rng = np.random.default_rng(3)
+    for k in range(200):
+        model.add_custom_object(f"object {k}", 1e26 * rng.uniform(0.1, 10), rng.uniform(-5, 5, 2) * AU,
+                                rng.uniform(-20000, 20000, 2))
+    return model.engine
+
+
+def relative_errors(theta):
+    direct = crowded_engine().accelerations()
+    tree = crowded_engine(force_solver="barnes-hut", theta=theta).accelerations()
+    return np.linalg.norm(tree - direct, axis=1) / np.linalg.norm(direct, axis=1)
+
+
+def test_tree_approximates_the_direct_sum():
+    assert np.median(relative_errors(0.5)) < 1e-2
+
+
+def test_smaller_opening_angle_is_more_accurate():
+    assert relative_errors(0.2).max() < relative_errors(0.8).max()
+    assert relative_errors(0.0).max() < 1e-10
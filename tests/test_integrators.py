@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from integrators import INTEGRATORS
+from kepler import kepler_drift
+from physics_engine import NBodyEngine
+from solar_system_model import SolarSystemModel, Body, G, AU, SECONDS_PER_YEAR
+
+GM = G * 1.989e30
+PERIOD = 2 * np.pi * np.sqrt(AU ** 3 / GM)
+
+
+def kepler_accelerations(pos):
+    r = np.linalg.norm(pos, axis=-1, keepdims=True)
+    return -GM * pos / r ** 3
+
+
+def orbit_error(integrator, steps):
+    # A third of an eccentric orbit, against the exact Kepler solution
+    pos = np.array([[AU, 0.0]])
+    vel = np.array([[0.0, 1.2 * np.sqrt(GM / AU)]])
+    duration = PERIOD / 3
+    exact_pos, exact_vel = pos.copy(), vel.copy()
+    kepler_drift(exact_pos, exact_vel, GM, duration)
+    INTEGRATORS[integrator](pos, vel, duration / steps, steps, kepler_accelerations)
+    return np.linalg.norm(pos - exact_pos) / AU
+
+
+@pytest.mark.parametrize("integrator, order", [("euler", 1), ("leapfrog", 2), ("velocity-verlet", 2),
+                                               ("yoshida4", 4)])
+def test_convergence_order(integrator, order):
+    coarse = orbit_error(integrator, 2000)
+    fine = orbit_error(integrator, 4000)
+    assert np.log2(coarse / fine) == pytest.approx(order, abs=0.3)
+
+
+@pytest.mark.parametrize("integrator", list(INTEGRATORS) + ["wisdom-holman"])
+def test_engine_keeps_a_circular_orbit(integrator):
+    engine = NBodyEngine(integrator=integrator)
+    engine.add_body(Body("sun", 1.989e30, [0.0, 0.0], [0.0, 0.0]), source=True)
+    planet = Body("planet", 6e24, [AU, 0.0], [0.0, np.sqrt(GM / AU)])
+    engine.add_body(planet)
+    engine.step(3600.0, int(SECONDS_PER_YEAR / 3600))
+    assert np.linalg.norm(planet.sim_pos) == pytest.approx(AU, rel=1e-3)
+
+
+def test_wisdom_holman_is_exact_for_two_bodies():
+    # Planets only feel the sun, so the mapping reduces to the exact Kepler drift even at 30-day steps
+    exact = SolarSystemModel.default(moons=False, propagation="kepler")
+    mapped = SolarSystemModel.default(moons=False, integrator="wisdom-holman")
+    exact.advance(3600 * 86400.0, 30 * 86400.0)
+    mapped.advance(3600 * 86400.0, 30 * 86400.0)
+    n = exact.engine.count
+    assert np.abs(mapped.engine.pos[:n] - exact.engine.pos[:n]).max() < 1e-6 * AU
@@ -0,0 +1,20 @@
+import numpy as np
+from solar_system_model import SolarSystemModel, AU
+
+
+def test_closed_form_matches_integration():
+    exact = SolarSystemModel.default(moons=False, propagation="kepler")
+    integrated = SolarSystemModel.default(moons=False, integrator="yoshida4")
+    exact.advance(360 * 86400.0, 86400.0)
+    integrated.advance(360 * 86400.0, 3600.0)
+    n = exact.engine.count
+    assert exact.engine.kepler is not None
+    assert np.abs(exact.engine.pos[:n] - integrated.engine.pos[:n]).max() < 1e-6 * AU
+
+
+def test_second_source_switches_to_integration():
+    model = SolarSystemModel.default(moons=False, propagation="kepler")
+    model.advance(86400.0, 3600.0)
+    model.add_custom_object("giant", 1e27, [3 * AU, 0.0], [0.0, 17000.0])
+    model.advance(86400.0, 3600.0)
+    assert model.engine.kepler is None
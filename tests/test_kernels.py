@@ -0,0 +1,38 @@
+import threading
+import time
+import numpy as np
+import pytest
+import kernels
+
+pytest.importorskip("numba")
+
+
+def test_backends_agree():
+    for name, error, _, _ in kernels.compare_backends(steps=200):
+        assert error < 1e-9, name
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_compare_backends_keeps_the_backend(monkeypatch, backend):
+    monkeypatch.setattr(kernels, "BACKEND", backend)
+    kernels.compare_backends(steps=1)
+    assert kernels.BACKEND == backend
+
+
+def test_kernels_release_the_gil():
+    # The physics worker runs them in a thread; the Qt thread must keep running meanwhile
+    rng = np.random.default_rng(1)
+    pos, vel = rng.normal(size=(200, 2)), np.zeros((200, 2))
+    mass, eps2 = np.ones(200), np.full(200, 0.01)
+    sources = np.arange(200)
+    kernels.integrate_sources("leapfrog", pos.copy(), vel.copy(), mass, eps2, sources, 1e-3, 1)  # compile first
+    worker = threading.Thread(target=kernels.integrate_sources,
+                              args=("leapfrog", pos, vel, mass, eps2, sources, 1e-3, 3000))
+    start = time.perf_counter()
+    worker.start()
+    last, longest_stall = start, 0.0
+    while worker.is_alive():
+        now = time.perf_counter()
+        longest_stall, last = max(longest_stall, now - last), now
+    worker.join()
+    assert longest_stall < (time.perf_counter() - start) / 2
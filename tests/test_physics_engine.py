@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from solar_system_model import SolarSystemModel, G, AU, SECONDS_PER_YEAR
+
+
+def test_plain_orbit_is_not_refined():
+    model = SolarSystemModel.default(moons=False, integrator="yoshida4")
+    model.add_custom_object("giant", 1e27, [3 * AU, 0.0], [0.0, 17000.0])
+    refinements = []
+    model.advance(SECONDS_PER_YEAR, 648000.0, progress=lambda done, total: refinements.append(model.engine.refinement),
+                  chunk=1)
+    assert set(refinements) == {1}
+    assert model.engine.step_counts[0] == len(refinements)
+
+
+def test_close_approach_is_refined():
+    model = SolarSystemModel.default(moons=False, integrator="leapfrog")
+    model.add_custom_object("a", 1e28, [3 * AU, 0.0], [0.0, 17000.0])
+    model.add_custom_object("b", 1e28, [3 * AU, -0.3 * AU], [1500.0, 17000.0])
+    refinements = []
+    model.advance(SECONDS_PER_YEAR, 86400.0, progress=lambda done, total: refinements.append(model.engine.refinement),
+                  chunk=1)
+    assert max(refinements) > 1
+
+
+def source_energy(engine):
+    # Kinetic plus softened potential energy of the attracting bodies, which is what they conserve
+    sources = np.flatnonzero(engine.is_source[:engine.count])
+    mass, pos, vel = engine.mass[sources], engine.pos[sources], engine.vel[sources]
+    d = pos[:, None, :] - pos[None, :, :]
+    r2 = np.einsum("ijk,ijk->ij", d, d) + np.add.outer(engine.softening[sources] ** 2,
+                                                        engine.softening[sources] ** 2) / 2
+    pair = np.triu(np.ones(r2.shape, dtype=bool), 1)
+    return 0.5 * (mass * (vel ** 2).sum(axis=1)).sum() - (G * np.outer(mass, mass)[pair] / np.sqrt(r2[pair])).sum()
+
+
+def test_plunge_toward_the_sun_is_refined():
+    model = SolarSystemModel.default(moons=False, integrator="leapfrog")
+    model.add_custom_object("diver", 1e29, [AU, 0.0], [0.0, 2000.0])
+    before = source_energy(model.engine)
+    refinements = []
+    model.advance(2190 * 3600.0, 3600.0, progress=lambda done, total: refinements.append(model.engine.refinement),
+                  chunk=16)
+    assert max(refinements) > 1
+    assert abs(source_energy(model.engine) / before - 1) < 1e-2
+
+
+@pytest.mark.parametrize("integrator, substeps", [("leapfrog", 16), ("wisdom-holman", 1)])
+def test_wisdom_holman_keeps_long_steps_on_plain_orbits(integrator, substeps):
+    # The Kepler drift follows the orbit, so a month-long step does not have to resolve it
+    model = SolarSystemModel.default(moons=False, integrator=integrator)
+    model.add_custom_object("giant", 1e27, [3 * AU, 0.0], [0.0, 17000.0])
+    assert model.engine.encounter_refinement(30 * 86400.0)[0] == substeps
+
+
+def test_wisdom_holman_refines_plunges_toward_the_sun():
+    # The central body's recoil and the softening are kicks, which have to resolve the pericentre passage
+    model = SolarSystemModel.default(moons=False, integrator="wisdom-holman")
+    model.add_custom_object("diver", 1e29, [AU, 0.0], [0.0, 2000.0])
+    before = source_energy(model.engine)
+    model.advance(2190 * 3600.0, 3600.0)
+    assert abs(source_energy(model.engine) / before - 1) < 1e-2
+
+
+def pairwise_accelerations(engine):
+    # The per-object attraction() loop the engine replaced
+    n = engine.count
+    result = np.zeros((n, 2))
+    for i in range(n):
+        for j in np.flatnonzero(engine.is_source[:n]):
+            if i == j:
+                continue
+            d = engine.pos[j] - engine.pos[i]
+            r2 = d @ d + (engine.softening[i] ** 2 + engine.softening[j] ** 2) / 2
+            result[i] += G * engine.mass[j] * d / r2 ** 1.5
+    return result
+
+
+def crowded_model(**engine_options):
+    model = SolarSystemModel.default(moons=False, **engine_options)
+    rng = np.random.default_rng(3)
+    for k in range(20):
+        model.add_custom_object(f"object {k}", 1e26 * rng.uniform(0.1, 10), rng.uniform(-5, 5, 2) * AU,
+                                rng.uniform(-20000, 20000, 2))
+    return model
+
+
+def test_accelerations_match_the_pairwise_sum():
+    engine = crowded_model().engine
+    expected = pairwise_accelerations(engine)
+    assert np.allclose(engine.accelerations(), expected, rtol=1e-12, atol=0)
+
+
+def test_bodies_are_views_of_their_rows():
+    model = crowded_model()
+    engine = model.engine
+    body = model.custom_objects[5]
+    body.sim_pos = [1.0, 2.0]
+    assert np.array_equal(engine.pos[body.engine_index], [1.0, 2.0])
+    count = engine.count
+    engine.remove_body(model.custom_objects[2])
+    assert engine.count == count - 1
+    assert all(engine.bodies[i].engine_index == i for i in range(engine.count))
+    assert np.array_equal(body.sim_pos, [1.0, 2.0])
+    assert np.array_equal(engine.pos[body.engine_index], [1.0, 2.0])
+
+
+def test_momentum_of_the_attracting_bodies_is_conserved():
+    # Only sources pull, so sources exchange momentum among themselves alone
+    model = crowded_model(integrator="leapfrog")
+    engine = model.engine
+    sources = np.flatnonzero(engine.is_source[:engine.count])
+
+    def momentum():
+        return (engine.mass[sources, None] * engine.vel[sources]).sum(axis=0)
+
+    before = momentum()
+    scale = (engine.mass[sources, None] * np.abs(engine.vel[sources])).sum()
+    model.advance(SECONDS_PER_YEAR / 10, 3600.0)
+    assert np.abs(momentum() - before).max() < 1e-12 * scale
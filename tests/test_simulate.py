@@ -0,0 +1,13 @@
+import json
+import simulate
+from solar_system_model import PLANETS, MOONS
+
+
+def test_writes_every_body(tmp_path):
+    path = str(tmp_path / "final.json")
+    assert simulate.main(["--years", "0.01", "--custom", "probe,1e25,1.5,0,0,25000", "--output", path]) == 0
+    state = json.load(open(path))
+    names = [body["name"] for body in state["bodies"]]
+    assert len(names) == 1 + len(PLANETS) + 1 + len(MOONS)
+    assert "probe" in names
+    assert state["time"] == 88 * 3600.0  # A hundredth of a year, rounded up to whole steps
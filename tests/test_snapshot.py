@@ -0,0 +1,100 @@
+import time
+import numpy as np
+import pytest
+from snapshot import Snapshot, Autosaver, encode_name
+from solar_system_model import SolarSystemModel, AU, SECONDS_PER_YEAR
+
+
+def session():
+    model = SolarSystemModel.default(integrator="leapfrog")
+    model.add_custom_object("probe", 1e25, [2 * AU, 0.0], [0.0, 21000.0], size=30)
+    return model
+
+
+def state(model):
+    engine, moons = model.engine, model.moon_system
+    return (engine.pos[:engine.count].copy(), engine.vel[:engine.count].copy(), moons.rel_pos.copy(),
+            moons.rel_vel.copy(), engine.time)
+
+
+def test_restore_continues_exactly(tmp_path):
+    model = session()
+    model.advance(SECONDS_PER_YEAR / 10, 3600.0)
+    path = str(tmp_path / "session.snap")
+    Snapshot.capture(model.engine, model.moon_system, 36.5, 0, model.custom_objects).save(path)
+    model.advance(SECONDS_PER_YEAR / 10, 3600.0)
+    expected = state(model)
+
+    snapshot = Snapshot.load(path)
+    assert list(snapshot.bodies["custom"]).count(True) == 1
+    assert float(snapshot.header["simulation_days"]) == 36.5
+    snapshot.restore(model.engine, model.moon_system)
+    model.advance(SECONDS_PER_YEAR / 10, 3600.0)
+    for value, reference in zip(state(model), expected):
+        assert np.array_equal(value, reference)
+
+
+def test_restore_rejects_other_bodies():
+    model = session()
+    snapshot = Snapshot.capture(model.engine, model.moon_system)
+    with pytest.raises(ValueError):
+        snapshot.restore(SolarSystemModel.default().engine, model.moon_system)
+
+
+def test_load_rejects_broken_files(tmp_path):
+    model = session()
+    path = tmp_path / "session.snap"
+    Snapshot.capture(model.engine, model.moon_system).save(str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[:-10])
+    with pytest.raises(ValueError):
+        Snapshot.load(str(path))
+    path.write_bytes(b"not a snapshot" + data)
+    with pytest.raises(ValueError):
+        Snapshot.load(str(path))
+
+
+def test_long_names_are_cut_between_characters(tmp_path):
+    model = SolarSystemModel.default()
+    model.add_custom_object("ü" * 20, 1e25, [2 * AU, 0.0], [0.0, 21000.0])
+    path = str(tmp_path / "session.snap")
+    Snapshot.capture(model.engine, model.moon_system, custom=model.custom_objects).save(path)
+    snapshot = Snapshot.load(path)
+    assert snapshot.bodies["name"][-1].decode() == "ü" * 16
+    snapshot.restore(model.engine, model.moon_system)
+    assert encode_name("ab€" * 20).decode().endswith("ab")
+
+
+def test_autosaver_writes_the_newest_snapshot(tmp_path):
+    model = session()
+    path = str(tmp_path / "auto.snap")
+    saver = Autosaver(path)
+    saver.start()
+    for _ in range(3):
+        model.advance(86400.0, 3600.0)
+        saver.submit(Snapshot.capture(model.engine, model.moon_system))
+    saver.stop()
+    assert saver.last_error is None
+    assert Snapshot.load(path).time == model.engine.time
+
+
+class BrokenSnapshot:
+    def save(self, path):
+        raise RuntimeError("broken")
+
+
+def test_autosaver_survives_errors(tmp_path, capfd):
+    model = session()
+    path = str(tmp_path / "auto.snap")
+    saver = Autosaver(path)
+    saver.start()
+    saver.submit(BrokenSnapshot())
+    deadline = time.time() + 10
+    while saver.last_error is None and saver.is_alive() and time.time() < deadline:
+        time.sleep(0.01)
+    saver.submit(Snapshot.capture(model.engine, model.moon_system))
+    saver.stop()
+    assert isinstance(saver.last_error, RuntimeError)
+    assert "RuntimeError: broken" in capfd.readouterr().err
+    assert saver.saves == 1
+    assert Snapshot.load(path).time == model.engine.time
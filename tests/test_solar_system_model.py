@@ -0,0 +1,54 @@
+import numpy as np
+from escape import EscapePolicy
+from physics_engine import ENCOUNTER_CHECK
+from solar_system_model import SolarSystemModel, CustomBody, AU
+
+
+def test_merged_objects_are_retired():
+    model = SolarSystemModel.default(moons=False, collisions="merge")
+    earth = model.engine.bodies[3]
+    momentum = earth.mass * earth.velocity + 1e25 * (earth.velocity + [0.0, 1000.0])
+    body = model.add_custom_object("impactor", 1e25, earth.sim_pos + [earth.radius, 0.0],
+                                   earth.velocity + [0.0, 1000.0], size=10)
+    earth_mass = earth.mass
+    # One collision check
+    retired = model.advance(ENCOUNTER_CHECK * 60.0, 60.0)
+    assert retired == [body]
+    assert model.custom_objects == []
+    assert body not in model.engine.bodies
+    assert earth.mass == earth_mass + 1e25
+    # Momentum of the pair, carried by the merged body; the sun's pull changes it a little meanwhile
+    assert np.linalg.norm(earth.mass * earth.velocity - momentum) < 1e-3 * np.linalg.norm(momentum)
+
+
+def test_escaped_objects_are_retired():
+    model = SolarSystemModel.default(moons=False, escape=EscapePolicy("distance", 2 * AU))
+    body = model.add_custom_object("runaway", 1e20, [1.9 * AU, 0.0], [100000.0, 0.0])
+    retired = model.advance(10 * 86400.0, 3600.0)
+    assert retired == [body]
+    assert model.custom_objects == []
+    assert model.engine.count == 9
+
+
+def test_bodies_of_another_owner_are_handed_back():
+    # The window fast-forwards its own engine through a model that did not add the custom objects
+    owner = SolarSystemModel.default(moons=False, escape=EscapePolicy("distance", 2 * AU))
+    body = CustomBody("runaway", 1e20, [1.9 * AU, 0.0], [100000.0, 0.0])
+    owner.engine.add_body(body, source=True)
+    model = SolarSystemModel(owner.engine, owner.moon_system)
+    assert model.advance(10 * 86400.0, 3600.0) == [body]
+    assert body.engine is None
+
+
+def test_fast_forward_reports_progress_and_stops_early():
+    model = SolarSystemModel.default()
+    reports = []
+
+    def progress(done, total):
+        reports.append((done, total))
+        return done < 3 * 86400.0
+
+    model.advance(10 * 86400.0, 3600.0, progress=progress, chunk=24)
+    assert reports == [(day * 86400.0, 10 * 86400.0) for day in (1, 2, 3)]
+    assert model.engine.time == 3 * 86400.0
+    assert model.moon_system.step_counts.min() == 3 * 240
@@ -0,0 +1,85 @@
+import numpy as np
+from solar_system_model import SolarSystemModel, AU
+from trajectory import TrajectoryRecorder, TrajectoryFile
+
+
+def record(model, recorder):
+    engine, moon_system = model.engine, model.moon_system
+    n = engine.count
+    return recorder.record(engine.time, engine.bodies, engine.pos[:n], engine.vel[:n], moon_system.moons,
+                           moon_system.rel_pos, moon_system.rel_vel, model.custom_objects)
+
+
+def test_records_round_trip_while_recording(tmp_path):
+    path = str(tmp_path / "run.traj")
+    model = SolarSystemModel.default(integrator="leapfrog")
+    recorder = TrajectoryRecorder(path, cadence=86400.0, chunk=8)
+    record(model, recorder)
+    reader = TrajectoryFile(path)
+    assert len(reader) == 1
+    expected = []
+    for day in range(20):
+        model.advance(86400.0, 3600.0)
+        assert record(model, recorder)
+        _, pos, vel = model.state()
+        expected.append(np.hstack((pos, vel)))
+    # The file grew past its first chunk; the reader picks that up without reopening
+    reader.refresh()
+    assert len(reader) == 21
+    assert reader.names == [body.name for body in model.engine.bodies] + [moon.name for moon in model.moon_system.moons]
+    assert reader.kinds.count("moon") == len(model.moons)
+    assert np.allclose(reader.states[1:], expected, rtol=1e-12, atol=1e-3)
+    assert np.array_equal(reader.times, np.arange(21) * 86400.0)
+
+
+def test_cadence_and_truncate(tmp_path):
+    model = SolarSystemModel.default(moons=False)
+    recorder = TrajectoryRecorder(str(tmp_path / "run.traj"), cadence=86400.0)
+    assert record(model, recorder)
+    model.advance(3600.0, 3600.0)
+    assert not record(model, recorder)
+    for _ in range(5):
+        model.advance(86400.0, 3600.0)
+        record(model, recorder)
+    recorder.truncate(2.5 * 86400.0)
+    assert recorder.count == 3
+    assert recorder.last_time == recorder.records["time"][2]
+
+
+def test_positions_at_hits_the_records(tmp_path):
+    path = str(tmp_path / "run.traj")
+    model = SolarSystemModel.default(moons=False)
+    recorder = TrajectoryRecorder(path, cadence=86400.0)
+    for _ in range(10):
+        record(model, recorder)
+        model.advance(86400.0, 3600.0)
+    recorder.close()
+    reader = TrajectoryFile(path)
+    assert np.array_equal(reader.positions_at(reader.times[4]), reader.states[4, :, :2])
+    between = reader.positions_at((reader.times[4] + reader.times[5]) / 2)
+    # The interpolated orbit stays at the planets' distances from the sun
+    distances = np.linalg.norm(between - between[0], axis=1)[1:]
+    assert np.allclose(distances, np.linalg.norm(reader.states[4, 1:, :2] - reader.states[4, 0, :2], axis=1),
+                       rtol=1e-3)
+
+
+def test_bodies_beyond_the_slots_are_dropped(tmp_path):
+    path = str(tmp_path / "run.traj")
+    model = SolarSystemModel.default(moons=False)
+    recorder = TrajectoryRecorder(path, slots=10)
+    model.add_custom_object("first", 1e25, [2 * AU, 0.0], [0.0, 21000.0])
+    model.add_custom_object("second", 1e25, [3 * AU, 0.0], [0.0, 17000.0])
+    record(model, recorder)
+    recorder.close()
+    assert recorder.dropped == 1
+    assert TrajectoryFile(path).names[-1] == "first"
+
+
+def test_long_names_are_cut_between_characters(tmp_path):
+    path = str(tmp_path / "run.traj")
+    model = SolarSystemModel.default(moons=False)
+    model.add_custom_object("ü" * 20, 1e25, [2 * AU, 0.0], [0.0, 21000.0])
+    recorder = TrajectoryRecorder(path)
+    record(model, recorder)
+    recorder.close()
+    assert TrajectoryFile(path).names[-1] == "ü" * 16
@@ -0,0 +1,185 @@
+import os
+import numpy as np
+from ephemeris import hermite
+from snapshot import encode_name
+
+# Trajectory files: the states of all planets, moons and custom objects at a
+# fixed simulated-time cadence. The file holds a header, a table of body slots
+# and the records; every record is the time followed by (x, y, vx, vy) of every
+# slot in engine coordinates, NaN where the body did not exist. The recorder
+# writes straight into a memory map that grows in chunks and only then bumps
+# the record count in the header, so other processes can map the same file
+# read-only (TrajectoryFile) and follow a run while it is being recorded.
+
+MAGIC = b"SSTRAJ01"
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("slots", "<i4"), ("used", "<i4"), ("count", "<i8"), ("capacity", "<i8"),
+                         ("cadence", "<f8")])
+# kind is planet, moon or custom; parent is the slot of a moon's planet and -1 otherwise
+SLOT_DTYPE = np.dtype([("name", "S32"), ("kind", "S8"), ("parent", "<i4"), ("mass", "<f8"), ("size", "<f8")])
+
+
+def record_dtype(slots):
+    return np.dtype([("time", "<f8"), ("state", "<f8", (slots, 4))])
+
+
+def records_offset(slots):
+    # Records start on a page boundary
+    table_end = HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * slots
+    return -(-table_end // 4096) * 4096
+
+
+class TrajectoryRecorder:
+    """Appends states to a trajectory file at most every `cadence` simulated seconds.
+
+    Bodies get a slot the first time they are recorded, up to `slots` bodies
+    per file; later ones are not recorded. The file grows by `chunk` records
+    whenever it is full.
+    """
+
+    def __init__(self, path, cadence=86400.0, slots=64, chunk=4096):
+        self.path = path
+        self.cadence = cadence
+        self.chunk = chunk
+        self.dtype = record_dtype(slots)
+        self.offset = records_offset(slots)
+        with open(path, "wb") as file:
+            file.truncate(self.offset)
+        self.header = np.memmap(path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        self.header[:] = (MAGIC, slots, 0, 0, 0, cadence)
+        self.table = np.memmap(path, dtype=SLOT_DTYPE, mode="r+", offset=HEADER_DTYPE.itemsize, shape=(slots,))
+        self.records = None
+        self._grow(chunk)
+        self.slot_of = {}  # Body -> slot, -1 for bodies that did not get one
+        self.dropped = 0  # Bodies not recorded because every slot was taken
+        self.last_time = None
+
+    @property
+    def count(self):
+        return int(self.header["count"][0])
+
+    def _grow(self, capacity):
+        if self.records is not None:
+            self.records.flush()
+        with open(self.path, "r+b") as file:
+            file.truncate(self.offset + capacity * self.dtype.itemsize)
+        self.records = np.memmap(self.path, dtype=self.dtype, mode="r+", offset=self.offset, shape=(capacity,))
+        self.header["capacity"] = capacity
+
+    def _slot(self, body, kind, parent=-1):
+        slot = self.slot_of.get(body)
+        if slot is None:
+            slot = int(self.header["used"][0])
+            if slot == len(self.table):
+                slot = -1
+                self.dropped += 1
+            else:
+                self.table[slot] = (encode_name(body.name), kind, parent, body.mass, getattr(body, "size", 0))
+                self.header["used"] = slot + 1
+            self.slot_of[body] = slot
+        return slot
+
+    def record(self, time, bodies, pos, vel, moons=(), moon_rel_pos=None, moon_rel_vel=None, custom=()):
+        """Append the state of engine rows (bodies, pos, vel) and of moons relative to their planets,
+        unless the last record is less than a cadence old. True if a record was written."""
+        if self.last_time is not None and time < self.last_time + self.cadence:
+            return False
+        count = self.count
+        if count == len(self.records):
+            self._grow(count + self.chunk)
+        custom = set(custom)
+        slots = np.array([self._slot(body, "custom" if body in custom else "planet") for body in bodies], dtype=int)
+        self.records["time"][count] = time
+        state = self.records["state"][count]
+        state[:] = np.nan
+        kept = slots >= 0
+        state[slots[kept], :2] = pos[kept]
+        state[slots[kept], 2:] = vel[kept]
+        if len(moons):
+            parents = np.array([self.slot_of.get(moon.planet, -1) for moon in moons], dtype=int)
+            moon_slots = np.array([self._slot(moon, "moon", parent) for moon, parent in zip(moons, parents)], dtype=int)
+            kept = (moon_slots >= 0) & (parents >= 0)
+            state[moon_slots[kept], :2] = state[parents[kept], :2] + moon_rel_pos[kept]
+            state[moon_slots[kept], 2:] = state[parents[kept], 2:] + moon_rel_vel[kept]
+        # Readers only look at records below the count, so it goes up once the record is complete
+        self.header["count"] = count + 1
+        self.last_time = time
+        return True
+
+    def truncate(self, time):
+        """Forget the records after `time`, e.g. when the simulation went back to an earlier state."""
+        count = self.count
+        keep = int(np.searchsorted(self.records["time"][:count], time, "right"))
+        self.header["count"] = keep
+        self.last_time = float(self.records["time"][keep - 1]) if keep else None
+
+    def close(self):
+        self.records.flush()
+        self.header.flush()
+        self.table.flush()
+
+
+class TrajectoryFile:
+    """Read-only view of a trajectory file, also while it is still being recorded; call refresh()
+    to pick up new records and bodies."""
+
+    def __init__(self, path):
+        self.path = path
+        self.header = np.memmap(path, dtype=HEADER_DTYPE, mode="r", shape=(1,))
+        if self.header["magic"][0] != MAGIC:
+            raise ValueError(f"{path} is not a trajectory file")
+        slots = int(self.header["slots"][0])
+        self.cadence = float(self.header["cadence"][0])
+        self.dtype = record_dtype(slots)
+        self.offset = records_offset(slots)
+        self.table = np.memmap(path, dtype=SLOT_DTYPE, mode="r", offset=HEADER_DTYPE.itemsize, shape=(slots,))
+        self.records = None
+        self.refresh()
+
+    def refresh(self):
+        capacity = min(int(self.header["capacity"][0]),
+                       (os.path.getsize(self.path) - self.offset) // self.dtype.itemsize)
+        if self.records is None or len(self.records) != capacity:
+            self.records = np.memmap(self.path, dtype=self.dtype, mode="r", offset=self.offset, shape=(capacity,))
+        self.count = min(int(self.header["count"][0]), capacity)
+        used = int(self.header["used"][0])
+        # Files of older versions may hold names cut in the middle of a character
+        self.names = [name.decode("utf-8", "ignore") for name in self.table["name"][:used]]
+        self.kinds = [kind.decode() for kind in self.table["kind"][:used]]
+        self.parents = self.table["parent"][:used].astype(int)
+        self.masses = self.table["mass"][:used].astype(float)
+        self.sizes = self.table["size"][:used].astype(float)
+
+    @property
+    def times(self):
+        return self.records["time"][:self.count]
+
+    @property
+    def states(self):
+        """(count, bodies, 4) array of x, y, vx, vy."""
+        return self.records["state"][:self.count, :len(self.names)]
+
+    @property
+    def start(self):
+        return float(self.records["time"][0]) if self.count else 0.0
+
+    @property
+    def end(self):
+        return float(self.records["time"][self.count - 1]) if self.count else 0.0
+
+    def positions_at(self, time):
+        """Positions (bodies, 2) at `time`, clamped to the recorded span and interpolated from the
+        records around it; NaN for bodies missing from either record."""
+        if self.count < 2:
+            return self.states[0, :, :2].copy() if self.count else np.zeros((len(self.names), 2))
+        k = int(np.searchsorted(self.times, time, "right")) - 1
+        k = min(max(k, 0), self.count - 2)
+        t0, t1 = self.records["time"][k:k + 2]
+        s = min(max((time - t0) / (t1 - t0), 0.0), 1.0)
+        first, second = self.records["state"][k:k + 2, :len(self.names)]
+        return hermite(first[:, :2], first[:, 2:], second[:, :2], second[:, 2:], t1 - t0, s)
+
+    def slot(self, name):
+        return self.names.index(name)
+
+    def __len__(self):
+        return self.count